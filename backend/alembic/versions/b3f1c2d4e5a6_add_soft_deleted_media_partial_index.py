@@ -0,0 +1,27 @@
+"""Add partial index on soft-deleted media
+
+Revision ID: b3f1c2d4e5a6
+Revises: 92a0e66dec74
+Create Date: 2026-10-16 22:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3f1c2d4e5a6'
+down_revision = '92a0e66dec74'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_media_soft_deleted', 'media', ['id'], unique=False,
+        postgresql_where=sa.text('is_active = false')
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_media_soft_deleted', table_name='media', postgresql_where=sa.text('is_active = false'))
@@ -0,0 +1,44 @@
+"""Cover soft-deleted media index and add soft-deleted studies index
+
+Revision ID: c4d2e3f5a6b7
+Revises: b3f1c2d4e5a6
+Create Date: 2026-10-16 23:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4d2e3f5a6b7'
+down_revision = 'b3f1c2d4e5a6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_media_soft_deleted', table_name='media', postgresql_concurrently=True)
+        op.create_index(
+            'ix_media_soft_deleted', 'media', ['id'], unique=False,
+            postgresql_include=['file_path', 'file_size', 'study_id'],
+            postgresql_where=sa.text('is_active = false'),
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_studies_soft_deleted', 'studies', ['id'], unique=False,
+            postgresql_where=sa.text('is_active = false'),
+            postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_studies_soft_deleted', table_name='studies', postgresql_concurrently=True)
+        op.drop_index('ix_media_soft_deleted', table_name='media', postgresql_concurrently=True)
+        op.create_index(
+            'ix_media_soft_deleted', 'media', ['id'], unique=False,
+            postgresql_where=sa.text('is_active = false'),
+            postgresql_concurrently=True
+        )
@@ -0,0 +1,32 @@
+"""Add video metadata columns to media
+
+Revision ID: d5e3f4a6b7c8
+Revises: c4d2e3f5a6b7
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5e3f4a6b7c8'
+down_revision = 'c4d2e3f5a6b7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('media', sa.Column('duration_seconds', sa.Float(), nullable=True))
+    op.add_column('media', sa.Column('width', sa.Integer(), nullable=True))
+    op.add_column('media', sa.Column('height', sa.Integer(), nullable=True))
+    op.add_column('media', sa.Column('fps', sa.Float(), nullable=True))
+    op.add_column('media', sa.Column('total_frames', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('media', 'total_frames')
+    op.drop_column('media', 'fps')
+    op.drop_column('media', 'height')
+    op.drop_column('media', 'width')
+    op.drop_column('media', 'duration_seconds')
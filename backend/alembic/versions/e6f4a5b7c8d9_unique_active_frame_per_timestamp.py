@@ -0,0 +1,50 @@
+"""Allow one active frame per video timestamp
+
+Revision ID: e6f4a5b7c8d9
+Revises: d5e3f4a6b7c8
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6f4a5b7c8d9'
+down_revision = 'd5e3f4a6b7c8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Concurrent extractions could race past the existence check; soft-delete all but
+    # the oldest active frame per timestamp (and its frame media) so the index can build
+    op.execute(sa.text("""
+        WITH ranked AS (
+            SELECT id, row_number() OVER (
+                PARTITION BY video_media_id, timestamp_seconds ORDER BY created_at, id
+            ) AS position
+            FROM frames
+            WHERE is_active
+        ), duplicates AS (
+            UPDATE frames SET is_active = false
+            FROM ranked
+            WHERE frames.id = ranked.id AND ranked.position > 1
+            RETURNING frames.frame_media_id
+        )
+        UPDATE media SET is_active = false
+        WHERE id IN (SELECT frame_media_id FROM duplicates)
+    """))
+    # CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ux_frames_video_timestamp_active', 'frames', ['video_media_id', 'timestamp_seconds'],
+            unique=True,
+            postgresql_where=sa.text('is_active'),
+            postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ux_frames_video_timestamp_active', table_name='frames', postgresql_concurrently=True)
@@ -0,0 +1,37 @@
+"""Add partial indexes for active media and studies lookups
+
+Revision ID: f7a5b6c8d9e0
+Revises: e6f4a5b7c8d9
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f7a5b6c8d9e0'
+down_revision = 'e6f4a5b7c8d9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_media_study_active_type', 'media', ['study_id', 'media_type'], unique=False,
+            postgresql_where=sa.text('is_active'),
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_studies_doctor_active_created', 'studies', ['doctor_id', 'created_at'], unique=False,
+            postgresql_where=sa.text('is_active'),
+            postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_studies_doctor_active_created', table_name='studies', postgresql_concurrently=True)
+        op.drop_index('ix_media_study_active_type', table_name='media', postgresql_concurrently=True)
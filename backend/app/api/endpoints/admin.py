@@ -14,6 +14,7 @@ from sqlalchemy.orm import Session
 from app.core.database import get_db
 from app.core.deps import require_admin_role
 from app.core.config import settings
+from app.core.cache import get_redis_cache
 from app.models.user import User as UserModel
 from app.models.user_role import UserRoleType
 from app.models.doctor_profile import DoctorProfileStatus
@@ -549,7 +550,7 @@ async def get_file_statistics(
     logger.debug("📊 Admin %s requesting file storage statistics", current_user.email)
     
     try:
-        file_management_service = FileManagementService(db)
+        file_management_service = FileManagementService(db, cache=get_redis_cache())
         stats = file_management_service.get_storage_statistics()
         
         logger.info(
@@ -611,9 +612,9 @@ async def start_hard_delete(
         
         # Create a new session for the background task
         def hard_delete_task(progress_callback):
-            from app.core.database import SessionLocal
-            with SessionLocal() as task_db:
-                task_service = FileManagementService(task_db)
+            from app.core.database import BackgroundSessionLocal
+            with BackgroundSessionLocal() as task_db:
+                task_service = FileManagementService(task_db, cache=get_redis_cache())
                 return task_service.hard_delete_soft_deleted_items(progress_callback)
         
         # Start background task
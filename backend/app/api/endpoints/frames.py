@@ -7,11 +7,14 @@ import logging
 from typing import cast
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status, Response
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
 from app.core.deps import require_doctor_role
+from app.core.ffmpeg_pool import run_ffmpeg_job
+from app.core.cache import get_redis_cache
 from app.models.user import User as UserModel
 from app.services.media_service import MediaService
 from app.services.frame_service import FrameService
@@ -54,7 +57,7 @@ async def get_video_metadata(
     logger.debug("📊 Doctor %s requesting video metadata for %s", current_user.email, video_id)
     frame_service = FrameService(db)
     check_media_access(current_user, frame_service, study_id)
-    metadata = frame_service.get_video_metadata(video_id)
+    metadata = await run_ffmpeg_job(frame_service.get_video_metadata, video_id)
     if not metadata:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -74,9 +77,9 @@ async def extract_frame(
     """Extract a frame from video at specified timestamp"""
     logger.debug("🎬 Doctor %s extracting frame from video %s at %s seconds", 
                 current_user.email, video_id, request.timestamp_seconds)
-    frame_service = FrameService(db)
+    frame_service = FrameService(db, cache=get_redis_cache())
     doctor_id = cast(UUID, current_user.id)
-    frame, message = frame_service.extract_frame_at_timestamp(
+    frame, message = await frame_service.extract_frame_at_timestamp(
         video_id, request.timestamp_seconds, doctor_id, study_id
     )
     if not frame:
@@ -125,17 +128,19 @@ async def get_frame_file(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Frame not found"
         )
-    file_data = media_service.get_media_file(cast(UUID, frame.frame_media_id), doctor_id)
-    if not file_data:
+    file_location = media_service.get_media_file_path(cast(UUID, frame.frame_media_id), doctor_id)
+    if not file_location:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Frame file not found (or access denied)"
         )
-    file_bytes, mime_type, filename = file_data
-    return Response(
-        content=file_bytes,
+    file_path, mime_type, filename = file_location
+    # Streamed from disk in chunks instead of being read into memory first
+    return FileResponse(
+        file_path,
         media_type=mime_type,
-        headers={"Content-Disposition": f"inline; filename={filename}"}
+        filename=filename,
+        content_disposition_type="inline"
     )
 
 
@@ -151,7 +156,8 @@ async def delete_frame(
     from app.core.cache import get_redis_cache
     from app.services.media_service import MediaService
     
-    frame_service = FrameService(db)
+    cache = get_redis_cache()
+    frame_service = FrameService(db, cache=cache)
     doctor_id = cast(UUID, current_user.id)
     
     # Get frame details before deletion
@@ -173,7 +179,6 @@ async def delete_frame(
         )
     
     # Invalidate annotation caches
-    cache = get_redis_cache()
     MediaService.invalidate_annotation_cache(frame_media_id, cache)
     MediaService.invalidate_annotation_cache(video_media_id, cache)
     logger.debug("🗑️ Invalidated annotation cache for frame %s and video %s", frame_media_id, video_media_id)
@@ -211,7 +216,7 @@ async def auto_extract_frames(
     """Automatically extract frames from video using runs-based algorithm"""
     logger.debug("🤖 Doctor %s requesting auto frame extraction for video %s", 
                 current_user.email, video_id)
-    auto_frame_service = AutoFrameService(db)
+    auto_frame_service = AutoFrameService(db, cache=get_redis_cache())
     doctor_id = cast(UUID, current_user.id)
     if request.params:
         params = request.params
@@ -226,7 +231,8 @@ async def auto_extract_frames(
         run_threshold=params.run_threshold,
         min_run_length=params.min_run_length,
         prediction_threshold=params.prediction_threshold,
-        patience=params.patience
+        patience=params.patience,
+        frame_stride=params.frame_stride
     )
     try:
         result = await auto_frame_service.extract_frames_auto(video_id, doctor_id, study_id,service_params)
@@ -9,7 +9,8 @@ from uuid import UUID
 import re
 
 from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Request, Header
-from fastapi.responses import StreamingResponse, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse, Response
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
@@ -20,6 +21,7 @@ from app.schemas.media import (
 )
 from app.services.media_service import MediaService
 from app.core.cache import get_redis_cache
+from app.core.ffmpeg_pool import run_ffmpeg_job
 
 
 logger = logging.getLogger(__name__)
@@ -55,14 +57,17 @@ async def upload_media(
         if is_dicom:
             from app.services.dicom_handler import process_dicom
             try:
-                processed_bytes, out_name, out_mime = process_dicom(file_data, filename)
+                processed_bytes, out_name, out_mime = await run_ffmpeg_job(process_dicom, file_data, filename)
                 # Replace payload with processed standard media
                 file_data = processed_bytes
                 filename = out_name
             except Exception as dicom_err:
                 logger.error("📤 DICOM processing failed: %s", dicom_err)
                 raise ValueError(f"DICOM processing failed: {dicom_err}") from dicom_err
-        media = media_service.create_media(study_id, doctor_id, file_data, filename)
+        # Storing the file and probing it block for a while; keep them off the event loop
+        media = await run_in_threadpool(
+            media_service.create_media, study_id, doctor_id, file_data, filename, get_redis_cache()
+        )
         logger.debug("📤 Media uploaded successfully: %s", media.id)
         return MediaUploadResponse(
             media=Media.model_validate(media),
@@ -269,7 +274,8 @@ async def delete_study_media(
     frame = db.query(Frame).filter(Frame.frame_media_id == media_id).first()
     parent_video_id = cast(UUID, frame.video_media_id) if frame else None
     
-    success = media_service.delete_media(media_id, doctor_id)
+    cache = get_redis_cache()
+    success = media_service.delete_media(media_id, doctor_id, cache)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -277,7 +283,6 @@ async def delete_study_media(
         )
     
     # Invalidate annotation cache
-    cache = get_redis_cache()
     MediaService.invalidate_annotation_cache(media_id, cache)
     
     # If this was a frame, also invalidate parent video cache
@@ -365,7 +370,7 @@ async def stream_media(
     
     # Get the requested range of data
     try:
-        range_data = media_service.get_media_file_range(media_id, doctor_id, start, end)
+        range_data = await run_in_threadpool(media_service.get_media_file_range, media_id, doctor_id, start, end)
         if not range_data:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -487,7 +492,7 @@ async def stream_video(
     
     # Get the requested range of data
     try:
-        range_data = media_service.get_media_file_range(media_id, doctor_id, start, end)
+        range_data = await run_in_threadpool(media_service.get_media_file_range, media_id, doctor_id, start, end)
         if not range_data:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -600,7 +605,7 @@ async def get_video_preview_frame(
     """
     Get a preview frame thumbnail for a video (extracted at 0.5s).
     Returns a small JPEG thumbnail (max 320x240) with browser caching headers.
-    Uses Redis + filesystem caching for performance.
+    Extracted once and then served from the filesystem cache.
     """
     logger.debug("🖼️ Doctor %s requesting preview frame for video %s", current_user.email, media_id)
     
@@ -621,29 +626,25 @@ async def get_video_preview_frame(
             detail="Media not found in the specified study"
         )
     
-    # Get Redis cache instance
-    cache = get_redis_cache()
-    
-    # Extract or retrieve cached preview frame
-    preview_data = media_service.get_video_preview_frame(media_id, doctor_id, cache)
+    # Extract or locate the cached preview frame
+    preview_path = await run_ffmpeg_job(media_service.ensure_preview_frame, media_id, doctor_id)
     
-    if not preview_data:
+    if not preview_path:
         # Silent failure - return 404 so frontend can fallback to icon
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Preview frame not available"
         )
     
-    logger.debug("✅ Serving preview frame for video %s (%.1f KB)", media_id, len(preview_data) / 1024)
+    logger.debug("✅ Serving preview frame for video %s", media_id)
     
-    # Return JPEG with aggressive browser caching
-    return Response(
-        content=preview_data,
+    # Return JPEG with aggressive browser caching, sent straight from disk
+    return FileResponse(
+        preview_path,
         media_type="image/jpeg",
         headers={
             "Cache-Control": "public, max-age=86400, immutable",  # Cache for 24 hours
-            "X-Content-Type-Options": "nosniff",
-            "Content-Length": str(len(preview_data))
+            "X-Content-Type-Options": "nosniff"
         }
     )
 
@@ -12,6 +12,7 @@ from sqlalchemy.orm import Session
 
 from app.core.database import get_db
 from app.core.deps import require_doctor_role
+from app.core.cache import get_redis_cache
 from app.models.user import User as UserModel
 from app.services.realtime_streaming_service import RealTimeStreamingService
 from app.schemas.streaming import (
@@ -35,7 +36,7 @@ async def create_streaming_session(
 ):
     """Create a new streaming session"""
     logger.debug("📺 Doctor %s creating streaming session for study %s", current_user.email, study_id)
-    streaming_service = RealTimeStreamingService(db)
+    streaming_service = RealTimeStreamingService(db, cache=get_redis_cache())
     doctor_id = cast(UUID, current_user.id)
     try:
         session_id = await streaming_service.create_streaming_session(study_id, doctor_id)
@@ -65,7 +66,7 @@ async def upload_video_chunk(
 ):
     """Upload a video chunk to the streaming session"""
     logger.debug("📺 Doctor %s uploading chunk to session %s", current_user.email, session_id)
-    streaming_service = RealTimeStreamingService(db)
+    streaming_service = RealTimeStreamingService(db, cache=get_redis_cache())
     try:
         chunk_data = await chunk.read()
         success = await streaming_service.append_video_chunk(session_id, chunk_data)
@@ -101,7 +102,7 @@ async def process_frame(
                 current_user.email, session_id, timestamp_seconds)
     logger.info("🔥 Frame file size: %s bytes, content type: %s", 
                 frame.size if hasattr(frame, 'size') else 'unknown', frame.content_type)
-    streaming_service = RealTimeStreamingService(db)
+    streaming_service = RealTimeStreamingService(db, cache=get_redis_cache())
     try:
         frame_data = await frame.read()
         result = await streaming_service.process_frame_realtime(
@@ -136,7 +137,7 @@ async def get_streaming_session_info(
 ):
     """Get information about a streaming session"""
     logger.debug("📺 Doctor %s requesting info for session %s", current_user.email, session_id)
-    streaming_service = RealTimeStreamingService(db)
+    streaming_service = RealTimeStreamingService(db, cache=get_redis_cache())
     try:
         session_info = streaming_service.get_session_info(session_id)
         if not session_info:
@@ -161,7 +162,7 @@ async def finalize_streaming_session(
 ):
     """Finalize a streaming session"""
     logger.debug("📺 Doctor %s finalizing session %s", current_user.email, session_id)
-    streaming_service = RealTimeStreamingService(db)
+    streaming_service = RealTimeStreamingService(db, cache=get_redis_cache())
     try:
         video_media_id = await streaming_service.finalize_streaming_session(session_id)
         if not video_media_id:
@@ -194,7 +195,7 @@ async def cancel_streaming_session(
 ):
     """Cancel a streaming session"""
     logger.debug("📺 Doctor %s canceling session %s", current_user.email, session_id)
-    streaming_service = RealTimeStreamingService(db)
+    streaming_service = RealTimeStreamingService(db, cache=get_redis_cache())
     try:
         await streaming_service.finalize_streaming_session(session_id)
         return {"message": "Streaming session canceled successfully"}
@@ -93,13 +93,14 @@ async def get_study(
     media_list = media_service.get_media_by_study(study_id, doctor_id)
     
     # Build media summaries with annotation status
+    annotation_statuses = media_service.check_has_annotations_bulk(
+        [cast(UUID, media.id) for media in media_list], doctor_id, cache
+    )
     media_summaries = []
     for media in media_list:
         media_dict = MediaSummary.model_validate(media).model_dump()
         # Populate has_annotations field
-        media_dict["has_annotations"] = media_service.check_has_annotations(
-            cast(UUID, media.id), doctor_id, cache
-        )
+        media_dict["has_annotations"] = annotation_statuses.get(cast(UUID, media.id), False)
         media_summaries.append(MediaSummary(**media_dict))
     
     study_dict = Study.model_validate(study).model_dump()
@@ -138,13 +139,14 @@ async def update_study(
 async def delete_study(
     study_id: UUID,
     db: Session = Depends(get_db),
-    current_user: UserModel = Depends(require_doctor_role)
+    current_user: UserModel = Depends(require_doctor_role),
+    cache = Depends(get_redis_cache)
 ):
     """Delete a study (soft delete)"""
     logger.info("🔬 Doctor %s deleting study %s", current_user.email, study_id)
     study_service = StudyService(db)
     doctor_id = cast(UUID, current_user.id)
-    success = study_service.delete_study(study_id, doctor_id)
+    success = study_service.delete_study(study_id, doctor_id, cache)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -157,11 +159,12 @@ async def delete_study(
 @router.get("/storage/info", response_model=StorageInfo)
 async def get_storage_info(
     db: Session = Depends(get_db),
-    current_user: UserModel = Depends(require_doctor_role)
+    current_user: UserModel = Depends(require_doctor_role),
+    cache = Depends(get_redis_cache)
 ):
     """Get storage usage information for the current doctor"""
     logger.info("📊 Doctor %s requesting storage info", current_user.email)
     media_service = MediaService(db)
     doctor_id = cast(UUID, current_user.id)
-    storage_info = media_service.get_storage_info(doctor_id)
+    storage_info = media_service.get_storage_info(doctor_id, cache)
     return StorageInfo(**storage_info)
@@ -20,6 +20,15 @@ redis_client: redis.Redis = redis.from_url(
 ) # type: ignore
 
 
+# INCRBY only when the counter is present, so a delta never seeds a partial total
+_INCRBY_IF_EXISTS_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call('INCRBY', KEYS[1], ARGV[1])
+end
+return nil
+"""
+
+
 class RedisCache:
     """Redis cache wrapper for binary data storage"""
     
@@ -50,6 +59,37 @@ class RedisCache:
             logger.warning("Redis SET failed for key %s: %s", key, e)
             return False
     
+    def mget(self, keys: list[str]) -> list[Optional[bytes]]:
+        """Get binary data for several keys in one round-trip"""
+        if not keys:
+            return []
+        try:
+            return self.client.mget(keys)  # type: ignore
+        except Exception as e:
+            logger.warning("Redis MGET failed for %d keys: %s", len(keys), e)
+            return [None] * len(keys)
+    
+    def mset(self, items: dict[str, tuple[bytes, int]]) -> bool:
+        """Set binary data for several keys, each with its TTL in seconds, in one round-trip"""
+        if not items:
+            return True
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for key, (value, ttl) in items.items():
+                pipe.setex(key, ttl, value)
+            return all(pipe.execute())
+        except Exception as e:
+            logger.warning("Redis pipelined SET failed for %d keys: %s", len(items), e)
+            return False
+    
+    def incrby_if_exists(self, key: str, amount: int) -> Optional[int]:
+        """Atomically add to an integer counter, leaving the key unset if it isn't cached"""
+        try:
+            return self.client.eval(_INCRBY_IF_EXISTS_SCRIPT, 1, key, amount)  # type: ignore
+        except Exception as e:
+            logger.warning("Redis INCRBY failed for key %s: %s", key, e)
+            return None
+    
     def delete(self, key: str) -> bool:
         """Delete key from cache"""
         try:
@@ -57,6 +97,23 @@ class RedisCache:
         except Exception as e:
             logger.warning("Redis DELETE failed for key %s: %s", key, e)
             return False
+    
+    def delete_matching(self, pattern: str) -> int:
+        """Delete every key matching a glob pattern, scanning incrementally instead of KEYS"""
+        try:
+            deleted = 0
+            batch: list = []
+            for key in self.client.scan_iter(match=pattern, count=500):
+                batch.append(key)
+                if len(batch) >= 500:
+                    deleted += self.client.delete(*batch)  # type: ignore
+                    batch = []
+            if batch:
+                deleted += self.client.delete(*batch)  # type: ignore
+            return deleted
+        except Exception as e:
+            logger.warning("Redis pattern DELETE failed for %s: %s", pattern, e)
+            return 0
 
 
 def get_redis_cache() -> RedisCache:
@@ -4,6 +4,8 @@ Application configuration settings.
 
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
+from typing import Literal
+
 from pydantic import field_validator
 
 
@@ -30,6 +32,10 @@ class Settings(BaseSettings):
     postgres_db: str = "iamedic"
     postgres_host: str = "postgres"
     postgres_port: int = 5432
+    db_pool_size: int = 20
+    db_max_overflow: int = 40
+    db_pool_timeout: int = 30  # seconds to wait for a pooled connection
+    db_pool_recycle: int = 300  # seconds before a pooled connection is replaced
     @property
     def database_url(self) -> str:
         """PostgreSQL database connection URL."""
@@ -62,6 +68,9 @@ class Settings(BaseSettings):
             # Handle comma-separated string
             return [origin.strip() for origin in v.split(',') if origin.strip()]
         return v
+    # Video decoding
+    ffmpeg_hwaccel: str = ""  # e.g. "cuda" to decode on NVDEC; empty decodes on the CPU
+    frame_image_format: Literal["jpeg", "webp"] = "jpeg"  # encoding of extracted video frames
     # MLFlow
     mlflow_uri: str = "http://host.docker.internal:8080"
     # Admin configuration
@@ -6,18 +6,28 @@ Database configuration and session management.
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 
 from app.core.config import settings
 
 
 engine = create_engine(
     settings.database_url,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
     pool_pre_ping=True,
-    pool_recycle=300,
+    pool_recycle=settings.db_pool_recycle,
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Long-running background jobs (e.g. hard delete) get an unpooled connection so
+# they never hold one of the request pool's slots for their whole duration
+background_engine = create_engine(settings.database_url, poolclass=NullPool)
+
+BackgroundSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=background_engine)
+
 Base = declarative_base()
 
 
@@ -0,0 +1,45 @@
+"""
+Process-wide worker pool for ffmpeg-bound work.
+
+ffmpeg runs as a child process, so worker threads spend their time blocked on
+its pipes with the GIL released. Running jobs here keeps them off the event
+loop and caps how many ffmpeg processes the backend starts at once.
+"""
+
+import asyncio
+import functools
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# One concurrent ffmpeg process per core; more would only contend for the CPU
+FFMPEG_WORKERS = os.cpu_count() or 4
+
+_executor = ThreadPoolExecutor(max_workers=FFMPEG_WORKERS, thread_name_prefix="ffmpeg")
+
+
+async def run_ffmpeg_job(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run a blocking ffmpeg-bound call on the shared pool and await its result.
+
+    Args:
+        func: Callable that spawns ffmpeg/ffprobe (directly or through a service)
+        *args: Positional arguments for the callable
+        **kwargs: Keyword arguments for the callable
+
+    Returns:
+        Whatever the callable returns
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+
+def shutdown_ffmpeg_pool() -> None:
+    """Wait for in-flight ffmpeg jobs and stop the pool"""
+    logger.info("Shutting down ffmpeg worker pool")
+    _executor.shutdown(wait=True)
@@ -51,6 +51,8 @@ class FileStorageService:
     MAX_FILE_SIZE = 1024 * 1024 * 1024  # 1GB in bytes
     # Maximum total storage per doctor: 2GB
     MAX_TOTAL_STORAGE = 2 * 1024 * 1024 * 1024  # 2GB in bytes
+    # Chunk size for streamed reads: each chunk is one threadpool hop in a StreamingResponse
+    STREAM_CHUNK_SIZE = 64 * 1024  # 64KB
     # Supported image MIME types
     SUPPORTED_IMAGE_TYPES = {
         'image/jpeg', 'image/jpg', 'image/png', 'image/gif', 'image/bmp',
@@ -218,12 +220,12 @@ class FileStorageService:
         except OSError as e:
             raise OSError(f"Failed to read file: {e}") from e
 
-    def read_file_chunked(self, file_id: str, chunk_size: int = 8192):
+    def read_file_chunked(self, file_id: str, chunk_size: int = STREAM_CHUNK_SIZE):
         """
         Generator that yields file chunks for streaming.
         Args:
             file_id: Unique file identifier
-            chunk_size: Size of each chunk in bytes (default 8KB)
+            chunk_size: Size of each chunk in bytes (default 64KB)
         Yields:
             bytes: File chunks
         Raises:
@@ -292,6 +294,17 @@ class FileStorageService:
         except OSError as e:
             raise OSError(f"Failed to delete file: {e}") from e
 
+    def get_local_path(self, file_id: str) -> Optional[str]:
+        """
+        Get the on-disk path of a stored file so tools like ffmpeg can read it in place.
+        Args:
+            file_id: Unique file identifier
+        Returns:
+            Absolute path as a string, or None if the file doesn't exist
+        """
+        file_path = self._get_file_path(file_id)
+        return str(file_path) if file_path.exists() else None
+
     def file_exists(self, file_id: str) -> bool:
         """Check if a file exists"""
         return self._get_file_path(file_id).exists()
@@ -321,24 +334,45 @@ class FileStorageService:
     def check_storage_availability(self, file_ids: list[str], additional_size: int) -> bool:
         """
         Check if there's enough storage for an additional file.
+        Stats every file; prefer has_storage_available with a usage total from the database.
         Args:
             file_ids: List of existing file IDs for the doctor
             additional_size: Size of the new file to upload
         Returns:
             True if storage is available, False otherwise
         """
-        current_usage = self.calculate_total_storage_used(file_ids)
-        return (current_usage + additional_size) <= self.MAX_TOTAL_STORAGE
+        return self.has_storage_available(self.calculate_total_storage_used(file_ids), additional_size)
+
+    def has_storage_available(self, used_bytes: int, additional_size: int) -> bool:
+        """
+        Check if there's enough storage for an additional file.
+        Args:
+            used_bytes: Storage already used by the doctor
+            additional_size: Size of the new file to upload
+        Returns:
+            True if storage is available, False otherwise
+        """
+        return (used_bytes + additional_size) <= self.MAX_TOTAL_STORAGE
 
     def get_storage_info(self, file_ids: list[str]) -> dict:
         """
         Get storage usage information.
+        Stats every file; prefer build_storage_info with a usage total from the database.
         Args:
             file_ids: List of file IDs for the doctor
         Returns:
             Dictionary with storage information
         """
-        used = self.calculate_total_storage_used(file_ids)
+        return self.build_storage_info(self.calculate_total_storage_used(file_ids))
+
+    def build_storage_info(self, used: int) -> dict:
+        """
+        Get storage usage information from a known usage total.
+        Args:
+            used: Storage used in bytes
+        Returns:
+            Dictionary with storage information
+        """
         total = self.MAX_TOTAL_STORAGE
         available = total - used
         percentage = (used / total) * 100
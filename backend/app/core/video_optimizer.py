@@ -141,6 +141,8 @@ class VideoOptimizer:
             
             video_stream = video_streams[0]
             format_info = info.get('format', {})
+            # r_frame_rate is a "num/den" fraction; parse it rather than eval() ffprobe output
+            numerator, _, denominator = video_stream.get('r_frame_rate', '0/1').partition('/')
             
             return {
                 'duration': float(format_info.get('duration', 0)),
@@ -149,7 +151,7 @@ class VideoOptimizer:
                 'width': int(video_stream.get('width', 0)),
                 'height': int(video_stream.get('height', 0)),
                 'codec': video_stream.get('codec_name', 'unknown'),
-                'fps': eval(video_stream.get('r_frame_rate', '0/1'))  # Convert fraction to float
+                'fps': int(numerator) / int(denominator) if denominator and int(denominator) else 0.0
             }
             
         except Exception as e:
@@ -5,7 +5,7 @@ Frame model definition - stores extracted video frames for analysis.
 
 import uuid
 
-from sqlalchemy import Column, DateTime, ForeignKey, Float, Integer, Boolean, Index
+from sqlalchemy import Column, DateTime, ForeignKey, Float, Integer, Boolean, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -37,6 +37,8 @@ class Frame(Base):
     __table_args__ = (
         Index('ix_frames_video_timestamp', 'video_media_id', 'timestamp_seconds'),
         Index('ix_frames_video_frame_num', 'video_media_id', 'frame_number'),
+        # At most one active frame per video timestamp
+        Index('ux_frames_video_timestamp_active', 'video_media_id', 'timestamp_seconds', unique=True, postgresql_where=text('is_active')),
     )
 
     def __repr__(self):
@@ -6,7 +6,7 @@ Media model definition.
 import uuid
 from enum import Enum
 
-from sqlalchemy import Column, String, DateTime, ForeignKey, BigInteger, CheckConstraint, Boolean, Enum as SQLEnum
+from sqlalchemy import Column, String, DateTime, ForeignKey, BigInteger, Integer, Float, CheckConstraint, Boolean, Index, Enum as SQLEnum, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -41,6 +41,12 @@ class Media(Base):
     media_type = Column(SQLEnum(MediaType, name='mediatype', values_callable=lambda x: [e.value for e in x]), nullable=False, index=True)
     upload_status = Column(SQLEnum(UploadStatus, name='uploadstatus', values_callable=lambda x: [e.value for e in x]), nullable=False, default=UploadStatus.UPLOADED, index=True)
     is_active = Column(Boolean, default=True, nullable=False, index=True)
+    # Video metadata, probed once at upload so frame extraction doesn't re-run ffprobe
+    duration_seconds = Column(Float, nullable=True)
+    width = Column(Integer, nullable=True)
+    height = Column(Integer, nullable=True)
+    fps = Column(Float, nullable=True)
+    total_frames = Column(Integer, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
     # Relationships
@@ -62,6 +68,14 @@ class Media(Base):
             f"upload_status IN ('{UploadStatus.UPLOADED.value}', '{UploadStatus.PROCESSING.value}', '{UploadStatus.FAILED.value}')",
             name='valid_upload_status'
         ),
+        # Covering partial index so soft-deleted lookups are index-only scans over the deleted rows
+        Index(
+            'ix_media_soft_deleted', 'id',
+            postgresql_include=['file_path', 'file_size', 'study_id'],
+            postgresql_where=text('is_active = false')
+        ),
+        # Active media of a study, by type (study listings, counts, storage sums)
+        Index('ix_media_study_active_type', 'study_id', 'media_type', postgresql_where=text('is_active')),
     )
 
     def __repr__(self):
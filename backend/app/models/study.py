@@ -5,7 +5,7 @@ Study model definition.
 
 import uuid
 
-from sqlalchemy import Column, String, DateTime, Boolean, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, String, DateTime, Boolean, ForeignKey, UniqueConstraint, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -29,6 +29,10 @@ class Study(Base):
     # Constraints
     __table_args__ = (
         UniqueConstraint('doctor_id', 'alias', name='unique_doctor_study_alias'),
+        # Partial index so soft-deleted lookups scan only the deleted rows
+        Index('ix_studies_soft_deleted', 'id', postgresql_where=text('is_active = false')),
+        # A doctor's active studies, newest first (listings and ownership joins)
+        Index('ix_studies_doctor_active_created', 'doctor_id', 'created_at', postgresql_where=text('is_active')),
     )
     
     def __repr__(self):
@@ -93,6 +93,7 @@ class AutoExtractionParams(BaseModel):
     min_run_length: int = Field(5, ge=1, description="Minimum number of consecutive frames to consider a valid run")
     prediction_threshold: float = Field(0.95, ge=0.0, le=1.0, description="Minimum probability threshold for extracting a frame")
     patience: int = Field(2, ge=0, description="Number of frames below threshold before ending a run")
+    frame_stride: int = Field(1, ge=1, description="Only every n-th frame is decoded and classified; run lengths and patience count sampled frames")
 
 
 class AutoExtractionRequest(BaseModel):
@@ -8,6 +8,7 @@ import os
 from typing import Optional
 from uuid import UUID
 
+from sqlalchemy import update
 from sqlalchemy.orm import Session, joinedload
 
 from app.models.user import User as UserModel
@@ -82,6 +83,7 @@ class AdminService:
         )
         self.db.add(db_role)
         self.db.commit()
+        self.db.info.pop("role_cache", None)
         self.db.refresh(db_role)
         logger.info("📊 Role %s assigned to user %s", role_data.role.value, role_data.user_id)
         return db_role
@@ -95,6 +97,7 @@ class AdminService:
         if db_role:
             self.db.delete(db_role)
             self.db.commit()
+            self.db.info.pop("role_cache", None)
             logger.info("📊 Role %s removed from user %s", role.value, user_id)
 
     def get_doctor_profiles_by_status(self, status: DoctorProfileStatus) -> list[DoctorProfileSchema]:
@@ -111,18 +114,22 @@ class AdminService:
         notes: Optional[str] = None
     ) -> Optional[DoctorProfileSchema]:
         """Update doctor profile status and notes"""
-        profile = self.db.query(DoctorProfileModel).filter(
-            DoctorProfileModel.id == profile_id
-        ).first()
+        values = {"status": status.value}
+        if notes:
+            values["notes"] = notes
+        # RETURNING hands back the updated row, so no lookup before or refresh after
+        profile = self.db.execute(
+            update(DoctorProfileModel)
+            .where(DoctorProfileModel.id == profile_id)
+            .values(**values)
+            .returning(DoctorProfileModel)
+        ).scalar_one_or_none()
         if not profile:
             return None
-        profile.status = status.value  # type: ignore
-        if notes:
-            profile.notes = notes  # type: ignore
+        updated_profile = DoctorProfileSchema.model_validate(profile)
         self.db.commit()
-        self.db.refresh(profile)
         logger.info("📊 Doctor profile %s status updated to %s", profile_id, status.value)
-        return DoctorProfileSchema.model_validate(profile)
+        return updated_profile
 
     def delete_user(self, user_id: UUID) -> bool:
         """Delete a user and all associated data"""
@@ -131,6 +138,7 @@ class AdminService:
             return False
         self.db.delete(user)
         self.db.commit()
+        self.db.info.pop("role_cache", None)
         logger.info("📊 User %s deleted", user_id)
         return True
 
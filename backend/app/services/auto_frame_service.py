@@ -7,29 +7,130 @@ Caches predictions to save computing power on subsequent requests.
 
 
 import logging
-import tempfile
-import os
 import base64
 import asyncio
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Iterable, Iterator, Optional, cast
 from uuid import UUID
 from dataclasses import dataclass
-from typing import cast
 
 import numpy as np
 import cv2
+import ffmpeg
 import httpx
 from sqlalchemy.orm import Session
 
-from app.models.media import Media, MediaType
+from app.models.media import Media, MediaType, UploadStatus
 from app.models.frame import Frame
-from app.services.media_service import MediaService
+from app.models.picture_classification_prediction import PictureClassificationPrediction
+from app.schemas.frame import FrameCreate
+from app.schemas.picture_classification_prediction import PictureClassificationPredictionCreate
+from app.services.media_service import MediaService, FFPROBE_LIMITS
 from app.services.frame_service import FrameService
 from app.services.ai_prediction_service_v2 import AIPredictionService
 from app.core.file_storage import FileStorageService
+from app.core.cache import RedisCache
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR
+    HAS_TURBOJPEG = True
+except ImportError:
+    HAS_TURBOJPEG = False
 
 
 logger = logging.getLogger(__name__)
 
+# JPEG quality for stored frames, kept high since frames are annotated by doctors
+FRAME_JPEG_QUALITY = 95
+# TTL for cached per-video classifier predictions
+PREDICTIONS_CACHE_TTL = 86400  # 24 hours
+
+
+def _jit(func):
+    """Compile a numeric kernel with numba when it is installed"""
+    return njit(cache=True)(func) if HAS_NUMBA else func
+
+
+@_jit
+def _append_run(out, count, predictions, run_start, run_end):
+    """Write (start, max_index, length, max_prob) of a run into out[count]"""
+    max_index = run_start
+    max_prob = predictions[run_start]
+    for j in range(run_start + 1, run_end + 1):
+        if predictions[j] > max_prob:
+            max_prob = predictions[j]
+            max_index = j
+    out[count, 0] = run_start
+    out[count, 1] = max_index
+    out[count, 2] = run_end - run_start + 1
+    out[count, 3] = max_prob
+    return count + 1
+
+
+@_jit
+def _get_runs_kernel(predictions, run_threshold, min_run_length, patience):
+    """Runs state machine over raw predictions, returns an (N, 4) array of runs"""
+    n = predictions.shape[0]
+    out = np.empty((n, 4), dtype=np.float64)
+    count = 0
+    run_start = -1
+    patience_counter = 0
+    for i in range(n):
+        if predictions[i] >= run_threshold:
+            if run_start < 0:
+                run_start = i
+                patience_counter = 0
+        elif run_start >= 0:
+            patience_counter += 1
+        if patience_counter > patience and run_start >= 0:
+            run_end = i - patience_counter
+            if run_end - run_start + 1 >= min_run_length:
+                count = _append_run(out, count, predictions, run_start, run_end)
+            run_start = -1
+            patience_counter = 0
+    if run_start >= 0:
+        run_end = n - 1
+        if run_end - run_start + 1 >= min_run_length:
+            count = _append_run(out, count, predictions, run_start, run_end)
+    return out[:count]
+
+
+def _get_runs_vectorized(predictions, run_threshold, min_run_length, patience):
+    """
+    NumPy equivalent of _get_runs_kernel for when numba is not installed.
+    Threshold crossings are computed on the whole array; the loop only visits runs.
+    """
+    n = predictions.shape[0]
+    above = predictions >= run_threshold
+    above_idx = np.flatnonzero(above)
+    below_idx = np.flatnonzero(~above)
+    rows = []
+    pos = 0
+    while pos < len(above_idx):
+        run_start = int(above_idx[pos])
+        # The patience counter is not reset within a run, so the run closes on the
+        # (patience + 1)-th below-threshold frame after its start
+        trigger_pos = (run_start - pos) + patience
+        if trigger_pos < len(below_idx):
+            trigger = int(below_idx[trigger_pos])
+            run_end = trigger - patience - 1
+            pos = int(np.searchsorted(above_idx, trigger, side='right'))
+        else:
+            run_end = n - 1
+            pos = len(above_idx)
+        if run_end - run_start + 1 >= min_run_length:
+            max_index = run_start + int(np.argmax(predictions[run_start:run_end + 1]))
+            rows.append((run_start, max_index, run_end - run_start + 1, predictions[max_index]))
+    return np.array(rows, dtype=np.float64).reshape(-1, 4)
+
 
 @dataclass
 class Run:
@@ -47,6 +148,7 @@ class AutoExtractionParams:
     min_run_length: int = 5
     prediction_threshold: float = 0.95
     patience: int = 2
+    frame_stride: int = 1
 
 
 @dataclass
@@ -61,27 +163,77 @@ class AutoExtractionResult:
 class AutoFrameService:
     """Service for automatic frame extraction using runs-based algorithm"""
     
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, cache: Optional[RedisCache] = None):
         self.db = db
+        self.cache = cache
         self.media_service = MediaService(db)
-        self.frame_service = FrameService(db)
+        self.frame_service = FrameService(db, cache)
         self.file_storage = FileStorageService()
         self.ai_service = AIPredictionService(db)
         self.classifier_service_url = "http://frame-classifier-service:8000"
+        self.prediction_batch_size = 50
+        self.prediction_concurrent_batches = 4
+        self.frame_upload_workers = 8
+        self._jpeg = None
+        if HAS_TURBOJPEG:
+            try:
+                self._jpeg = TurboJPEG()
+            except Exception as e:
+                logger.debug(f"libturbojpeg not available, using OpenCV JPEG encoder: {e}")
+
+    def _encode_jpeg(self, frame_image: np.ndarray) -> bytes:
+        """Encode a BGR frame as JPEG, using libjpeg-turbo when available"""
+        if self._jpeg is not None:
+            return self._jpeg.encode(frame_image, quality=FRAME_JPEG_QUALITY, pixel_format=TJPF_BGR)
+        ok, encoded_frame = cv2.imencode(".jpg", frame_image, [cv2.IMWRITE_JPEG_QUALITY, FRAME_JPEG_QUALITY])
+        if not ok:
+            raise ValueError("Failed to encode frame as JPEG")
+        return encoded_frame.tobytes()
+
+    def _open_video_capture(self, video_path: str) -> cv2.VideoCapture:
+        """Open a video through FFmpeg, preferring hardware decoding when available"""
+        try:
+            cap = cv2.VideoCapture(
+                video_path,
+                cv2.CAP_FFMPEG,
+                [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY]
+            )
+            if cap.isOpened():
+                logger.debug(f"Opened video with hw acceleration {cap.get(cv2.CAP_PROP_HW_ACCELERATION)}")
+                return cap
+            cap.release()
+        except Exception as e:
+            logger.debug(f"Hardware accelerated decoding not available: {e}")
+        return cv2.VideoCapture(video_path)
 
-    def get_video_frames(self, video_path: str) -> tuple[list[np.ndarray], float]:
-        """Extract all frames from a video file"""
-        cap = cv2.VideoCapture(video_path)
+    def _get_video_fps(self, cap: cv2.VideoCapture, video_path: str) -> float:
+        """Read the container frame rate, probing with ffprobe when OpenCV cannot report it"""
         fps = cap.get(cv2.CAP_PROP_FPS)
-        frames = []
+        if fps and fps > 0:
+            return fps
+        try:
+            metadata = ffmpeg.probe(video_path, select_streams='v:0', v='error', **FFPROBE_LIMITS)
+            stream = metadata.get('streams', [{}])[0]
+            numerator, _, denominator = stream.get('avg_frame_rate', '0/1').partition('/')
+            fps = float(numerator) / float(denominator or 1)
+        except Exception as e:
+            logger.warning(f"Could not probe frame rate of {video_path}: {e}")
+            fps = 0.0
+        if fps <= 0:
+            raise ValueError("Could not determine video frame rate")
+        return fps
+
+    def iter_video_frames(self, cap: cv2.VideoCapture, stride: int = 1) -> Iterator[np.ndarray]:
+        """Yield every stride-th frame of an opened video as grayscale, one at a time"""
         while cap.isOpened():
             ret, frame = cap.read()
             if not ret:
                 break
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            frames.append(np.array(frame, dtype=np.uint8))
-        cap.release()
-        return frames, fps
+            yield cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            # Skipped frames are only grabbed, never retrieved or converted
+            for _ in range(stride - 1):
+                if not cap.grab():
+                    return
 
     def get_runs(
         self, 
@@ -89,44 +241,21 @@ class AutoFrameService:
         params: AutoExtractionParams
     ) -> list[Run]:
         """Get runs of predictions above threshold"""
-        runs: list[Run] = []
-        run_start = None
-        patience_counter = 0
-        for i, prob in enumerate(predictions):
-            if prob >= params.run_threshold:
-                if run_start is None:
-                    run_start = i
-                    patience_counter = 0
-            elif run_start is not None:
-                patience_counter += 1   
-            if patience_counter > params.patience and run_start is not None:
-                run_end = i - patience_counter
-                run_length = run_end - run_start + 1
-                
-                if run_length >= params.min_run_length:
-                    max_index = int(np.argmax(predictions[run_start:run_end + 1]) + run_start)
-                    max_prob = predictions[max_index]
-                    runs.append(Run(
-                        start=run_start, 
-                        max_prob=max_prob, 
-                        max_index=max_index, 
-                        length=run_length
-                    ))
-                run_start = None
-                patience_counter = 0
-        if run_start is not None:
-            run_end = len(predictions) - 1
-            run_length = run_end - run_start + 1
-            if run_length >= params.min_run_length:
-                max_index = int(np.argmax(predictions[run_start:run_end + 1]) + run_start)
-                max_prob = predictions[max_index]
-                runs.append(Run(
-                    start=run_start, 
-                    max_prob=max_prob, 
-                    max_index=max_index, 
-                    length=run_length
-                ))
-        return runs
+        get_runs_impl = _get_runs_kernel if HAS_NUMBA else _get_runs_vectorized
+        raw_runs = get_runs_impl(
+            np.ascontiguousarray(predictions, dtype=np.float64),
+            float(params.run_threshold),
+            int(params.min_run_length),
+            int(params.patience)
+        )
+        return [
+            Run(
+                start=int(start),
+                max_prob=float(max_prob),
+                max_index=int(max_index),
+                length=int(length)
+            ) for start, max_index, length, max_prob in raw_runs
+        ]
     
     async def extract_frames_auto(
         self, 
@@ -144,126 +273,287 @@ class AutoFrameService:
             video_media = self.db.query(Media).filter(Media.id == video_media_id).first()
             if not video_media or video_media.media_type.value != MediaType.VIDEO.value:
                 raise ValueError(f"Video media not found: {video_media_id}")
+            # The stored video is read in place instead of copying it to a temp file
+            video_path = self.file_storage.get_local_path(str(video_media.file_path))
+            if not video_path:
+                raise FileNotFoundError(f"Video file not accessible: {video_media.file_path}")
+            model_info = await self.ai_service.get_model_info("classifier")
+            if not model_info:
+                raise RuntimeError("Classifier model not available in AI service")
+            model_version = model_info.get("version", "unknown")
+            logger.debug(f"Streaming frames from video {video_media_id} for prediction")
+            stride = max(1, params.frame_stride)
+            predictions = self._get_cached_predictions(video_media_id, model_version, stride)
+            cap = self._open_video_capture(video_path)
             try:
-                file_data, file_name = self.file_storage.read_file(str(video_media.file_path))
-                logger.debug(f"Read video file {file_name} of size {len(file_data)} bytes")
-            except Exception as e:
-                raise FileNotFoundError(f"Video file not accessible: {e}")
-            with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as video_temp:
-                video_temp.write(file_data)
-                video_temp_path = video_temp.name
-                logger.debug(f"Temporary video file created at {video_temp_path}")
-            try:
-                logger.debug(f"Extracting frames from video {video_media_id}")
-                video_frames, video_fps = self.get_video_frames(video_temp_path)
-                logger.debug(f"Extracted {len(video_frames)} frames at {video_fps} FPS")
-                if os.path.exists(video_temp_path):
-                    os.unlink(video_temp_path)
-                total_frames = len(video_frames)
-                if total_frames == 0:
-                    raise ValueError("No frames could be extracted from video")
-                logger.debug(f"Processing {total_frames} frames for prediction")
-                model_info = await self.ai_service.get_model_info("classifier")
-                if not model_info:
-                    raise RuntimeError("Classifier model not available in AI service")
-                model_version = model_info.get("version", "unknown")
-                predictions = await self._predict_frames_with_ai_service(video_frames)
-                runs = self.get_runs(predictions, params)
-                logger.debug(f"Found {len(runs)} runs in video {video_media_id}")
-                extracted_frames = []
-                for run in runs:
-                    if run.max_prob >= params.prediction_threshold:
-                        frame_index = run.max_index
-                        logger.debug(f"Extracting frame at index {frame_index} with prob {run.max_prob}")
-                        timestamp_seconds = frame_index / video_fps
-                        try:
-                            frame, _ = self.frame_service.extract_frame_at_timestamp(
-                                video_media_id,
-                                timestamp_seconds,
-                                doctor_id,
-                                study_id
-                            )
-                            if frame:
-                                frame_media_id = cast(UUID, frame.frame_media_id)
-                                extracted_frames.append(frame)
-                                if self.ai_service.get_cached_classification_prediction(
-                                    frame_media_id, model_version
-                                ):
-                                    continue
-                                self.ai_service._cache_classification_prediction(
-                                    frame_media_id,
-                                    MediaType.FRAME.value,
-                                    run.max_prob,
-                                    model_version
-                                )
-                        except Exception as e:
-                            logger.error(f"Failed to extract frame at index {frame_index}: {e}")
-                            continue
-                self.db.commit()
-                return AutoExtractionResult(
-                    frames=extracted_frames,
-                    total_frames_analyzed=total_frames,
-                    runs_found=len(runs),
-                    compliant_frames=len(extracted_frames)
-                )
+                video_fps = self._get_video_fps(cap, video_path)
+                if predictions is None:
+                    predictions, complete = await self._predict_frames_with_ai_service(
+                        self.iter_video_frames(cap, stride)
+                    )
+                    if complete:
+                        self._cache_predictions(video_media_id, model_version, stride, predictions)
+                else:
+                    logger.debug(f"✅ Predictions cache hit for video {video_media_id}")
             finally:
-                if os.path.exists(video_temp_path):
-                    os.unlink(video_temp_path)
+                cap.release()
+            total_frames = len(predictions)
+            if total_frames == 0:
+                raise ValueError("No frames could be extracted from video")
+            logger.debug(f"Predicted {total_frames} frames at {video_fps} FPS")
+            runs = self.get_runs(predictions, params)
+            for run in runs:
+                # Map indices from sampled predictions back to video frames
+                run.start *= stride
+                run.max_index *= stride
+            logger.debug(f"Found {len(runs)} runs in video {video_media_id}")
+            extracted_frames: list[Frame] = []
+            pending_runs: list[tuple[Run, float]] = []
+            reused_frames: list[tuple[Run, Frame]] = []
+            # Prefetch this video's frames, including soft-deleted ones that may be reactivated;
+            # an active frame wins over soft-deleted duplicates at the same timestamp
+            existing_frames: dict[float, Frame] = {}
+            for frame in self.db.query(Frame).filter(Frame.video_media_id == video_media_id).all():
+                timestamp_seconds = cast(float, frame.timestamp_seconds)
+                if timestamp_seconds not in existing_frames or frame.is_active:
+                    existing_frames[timestamp_seconds] = frame
+            for run in runs:
+                if run.max_prob < params.prediction_threshold:
+                    continue
+                timestamp_seconds = run.max_index / video_fps
+                existing_frame = existing_frames.get(timestamp_seconds)
+                if not existing_frame:
+                    pending_runs.append((run, timestamp_seconds))
+                    continue
+                try:
+                    if not cast(bool, existing_frame.is_active):
+                        existing_frame = self.frame_service._reactivate_frame(existing_frame)
+                    extracted_frames.append(existing_frame)
+                    reused_frames.append((run, existing_frame))
+                except Exception as e:
+                    logger.error(f"Failed to reuse frame at index {run.max_index}: {e}")
+                    continue
+            if reused_frames:
+                self._add_missing_predictions(reused_frames, model_version)
+            if pending_runs:
+                extracted_frames.extend(self._extract_and_save_frames(
+                    video_media, video_path, pending_runs, model_version
+                ))
+            self.db.commit()
+            if extracted_frames:
+                # New and reactivated frames count towards the doctor's storage
+                MediaService.invalidate_storage_cache(doctor_id, self.cache)
+            return AutoExtractionResult(
+                frames=extracted_frames,
+                total_frames_analyzed=total_frames,
+                runs_found=len(runs),
+                compliant_frames=len(extracted_frames)
+            )
         except Exception as e:
             logger.error(f"Error in auto frame extraction for video {video_media_id}: {e}")
             self.db.rollback()
             raise e
 
-    async def _predict_frames_with_ai_service(self, video_frames: list[np.ndarray]) -> np.ndarray:
-        """Predict frame usefulness using the AI service"""
+    def _add_missing_predictions(self, reused_frames: list[tuple[Run, Frame]], model_version: str) -> None:
+        """Add classification predictions for reused frames that lack one, checking them in one query"""
+        frame_media_ids = [cast(UUID, frame.frame_media_id) for _, frame in reused_frames]
+        existing_ids = {
+            media_id for (media_id,) in self.db.query(PictureClassificationPrediction.media_id).filter(
+                PictureClassificationPrediction.media_id.in_(frame_media_ids),
+                PictureClassificationPrediction.model_version == model_version
+            ).all()
+        }
+        for (run, _), frame_media_id in zip(reused_frames, frame_media_ids):
+            if frame_media_id in existing_ids:
+                continue
+            existing_ids.add(frame_media_id)
+            self.db.add(PictureClassificationPrediction(**PictureClassificationPredictionCreate(
+                media_id=frame_media_id,
+                media_type=MediaType.FRAME,
+                prediction=run.max_prob,
+                model_version=model_version
+            ).model_dump()))
+
+    def _upload_frame(
+        self,
+        video_media_id: UUID,
+        timestamp_seconds: float,
+        frame_image: np.ndarray
+    ) -> Optional[tuple[str, str, int]]:
+        """Encode and store one frame, returning (filename, file id, size) or None on failure"""
         try:
-            logger.debug(f"Predicting usefulness for {len(video_frames)} frames")
-            predictions = []
-            tasks = []
-            batch_size = 50
-            for i in range(0, len(video_frames), batch_size):
-                batch_frames = video_frames[i:i + batch_size]
-                tasks.append(self._predict_batch_frames(batch_frames))
+            frame_data = self._encode_jpeg(frame_image)
+            frame_filename = f"frame_{video_media_id}_{timestamp_seconds:.3f}s_{uuid.uuid4().hex[:8]}.jpg"
+            frame_file_info = self.file_storage.create_file(frame_data, frame_filename)
+            return frame_filename, frame_file_info.file_id, len(frame_data)
+        except Exception as e:
+            logger.error(f"Failed to store frame at {timestamp_seconds:.3f}s: {e}")
+            return None
+
+    def _extract_and_save_frames(
+        self,
+        video_media: Media,
+        video_path: str,
+        pending_runs: list[tuple[Run, float]],
+        model_version: str
+    ) -> list[Frame]:
+        """Decode and store the frames of compliant runs, inserting all their rows in one commit"""
+        video_media_id = cast(UUID, video_media.id)
+        decoded_frames: list[tuple[Run, float, np.ndarray]] = []
+        cap = self._open_video_capture(video_path)
+        try:
+            for run, timestamp_seconds in pending_runs:
+                logger.debug(f"Extracting frame at index {run.max_index} with prob {run.max_prob}")
+                cap.set(cv2.CAP_PROP_POS_FRAMES, run.max_index)
+                ret, frame_image = cap.read()
+                if not ret:
+                    logger.error(f"Failed to decode frame at index {run.max_index}")
+                    continue
+                decoded_frames.append((run, timestamp_seconds, frame_image))
+        finally:
+            cap.release()
+        # Encoding and storage release the GIL, so uploads run concurrently
+        with ThreadPoolExecutor(max_workers=self.frame_upload_workers) as executor:
+            uploads = list(executor.map(
+                lambda item: self._upload_frame(video_media_id, item[1], item[2]),
+                decoded_frames
+            ))
+        # Taken after decoding so the video row lock is only held until the commit below
+        frame_number = self.frame_service.get_last_frame_number(video_media_id)
+        media_rows: list[Media] = []
+        frame_rows: list[Frame] = []
+        prediction_rows: list[PictureClassificationPrediction] = []
+        for (run, timestamp_seconds, frame_image), upload in zip(decoded_frames, uploads):
+            if upload is None:
+                continue
+            frame_filename, frame_file_id, frame_size = upload
+            height, width = frame_image.shape[:2]
+            frame_media_id = uuid.uuid4()
+            frame_number += 1
+            media_rows.append(Media(
+                id=frame_media_id,
+                study_id=video_media.study_id,
+                filename=frame_filename,
+                file_path=frame_file_id,
+                file_size=frame_size,
+                mime_type='image/jpeg',
+                media_type=MediaType.FRAME,
+                upload_status=UploadStatus.UPLOADED
+            ))
+            frame_rows.append(Frame(**FrameCreate(
+                video_media_id=video_media_id,
+                frame_media_id=frame_media_id,
+                timestamp_seconds=timestamp_seconds,
+                frame_number=frame_number,
+                width=width,
+                height=height
+            ).model_dump()))
+            prediction_rows.append(PictureClassificationPrediction(**PictureClassificationPredictionCreate(
+                media_id=frame_media_id,
+                media_type=MediaType.FRAME,
+                prediction=run.max_prob,
+                model_version=model_version
+            ).model_dump()))
+        # Client-side ids let the unit of work batch each table into a single INSERT
+        self.db.add_all(media_rows)
+        self.db.add_all(frame_rows)
+        self.db.add_all(prediction_rows)
+        self.db.commit()
+        logger.info(f"Saved {len(frame_rows)} extracted frames for video {video_media_id}")
+        return frame_rows
+
+    def _predictions_cache_keys(self, video_media_id: UUID, model_version: str, stride: int) -> tuple[str, str]:
+        """Redis keys for a video's predictions and their frame count"""
+        key = f"video_predictions:{video_media_id}:{model_version}:{stride}"
+        return key, f"{key}:count"
+
+    def _get_cached_predictions(self, video_media_id: UUID, model_version: str, stride: int) -> Optional[np.ndarray]:
+        """Get cached per-frame predictions for a video, if present and intact"""
+        if not self.cache:
+            return None
+        data_key, count_key = self._predictions_cache_keys(video_media_id, model_version, stride)
+        try:
+            data = self.cache.get(data_key)
+            count = self.cache.get(count_key)
+            if not data or not count:
+                return None
+            predictions = np.frombuffer(data, dtype=np.float64)
+            if len(predictions) != int(count):
+                logger.warning(f"Discarding cached predictions for video {video_media_id}: length mismatch")
+                return None
+            return predictions
+        except Exception as e:
+            logger.warning(f"Predictions cache lookup failed for video {video_media_id}: {e}")
+            return None
+
+    def _cache_predictions(
+        self,
+        video_media_id: UUID,
+        model_version: str,
+        stride: int,
+        predictions: np.ndarray
+    ) -> None:
+        """Cache per-frame predictions for a video"""
+        if not self.cache or len(predictions) == 0:
+            return
+        data_key, count_key = self._predictions_cache_keys(video_media_id, model_version, stride)
+        self.cache.set(data_key, predictions.astype(np.float64).tobytes(), ttl=PREDICTIONS_CACHE_TTL)
+        self.cache.set(count_key, str(len(predictions)).encode('ascii'), ttl=PREDICTIONS_CACHE_TTL)
+
+    async def _predict_frames_with_ai_service(
+        self,
+        video_frames: Iterable[np.ndarray]
+    ) -> tuple[np.ndarray, bool]:
+        """
+        Predict frame usefulness using the AI service, keeping only one window of frames in memory.
+        Returns the predictions and whether every batch was predicted successfully.
+        """
+        predictions: list[float] = []
+        complete = True
+        batch_size = self.prediction_batch_size
+        frames_iter = iter(video_frames)
+        while True:
+            window = list(islice(frames_iter, batch_size * self.prediction_concurrent_batches))
+            if not window:
+                break
+            tasks = [
+                self._predict_batch_frames(window[i:i + batch_size])
+                for i in range(0, len(window), batch_size)
+            ]
             batch_predictions = await asyncio.gather(*tasks)
-            for batch in batch_predictions:
+            for batch, start in zip(batch_predictions, range(0, len(window), batch_size)):
+                if batch is None:
+                    complete = False
+                    batch = [0.0] * len(window[start:start + batch_size])
                 predictions.extend(batch)
-                logger.debug(f"Processed batch {i//batch_size + 1}/{(len(video_frames) + batch_size - 1)//batch_size}")
-            return np.array(predictions)
-        except Exception as e:
-            logger.error(f"Error predicting frames with AI service: {e}")
-            return np.zeros(len(video_frames))
-    
-    async def _predict_batch_frames(self, frames: list[np.ndarray]) -> list[float]:
-        """Predict a batch of frames using direct HTTP call to classifier service"""
-        predictions = []
-        for frame in frames:
-            try:
-                height, width = frame.shape
-                frame_b64 = base64.b64encode(frame).decode('ascii')
-                prediction_score = await self._call_classifier_service(frame_b64, width, height)
-                predictions.append(prediction_score)
-            except Exception as e:
-                logger.warning(f"Error predicting single frame: {e}")
-                predictions.append(0.0)
-        return predictions
+            logger.debug(f"Processed {len(predictions)} frames")
+        return np.array(predictions), complete
     
-    async def _call_classifier_service(self, image_data_b64: str, width: int, height: int) -> float:
-        """Make direct HTTP call to classifier service"""
+    async def _predict_batch_frames(self, frames: list[np.ndarray]) -> Optional[list[float]]:
+        """Predict a batch of frames with a single HTTP call to the classifier service"""
         try:
-            async with httpx.AsyncClient() as client:
+            images = [
+                {
+                    "data": base64.b64encode(frame).decode('ascii'),
+                    "width": frame.shape[1],
+                    "height": frame.shape[0]
+                } for frame in frames
+            ]
+            async with httpx.AsyncClient(timeout=60.0) as client:
                 response = await client.post(
-                    f"{self.classifier_service_url}/predict",
-                    json={"data": image_data_b64, "width": width, "height": height}
+                    f"{self.classifier_service_url}/predict-batch",
+                    json={"images": images}
                 )
-                if response.status_code == 200:
-                    result = response.json()
-                    return float(result.get("prediction", 0.0))
-                else:
-                    logger.warning(f"Classifier service returned status {response.status_code}")
-                    return 0.0
+            if response.status_code == 200:
+                predictions = response.json().get("predictions", [])
+                if len(predictions) == len(frames):
+                    return [float(p) for p in predictions]
+                logger.warning(f"Classifier service returned {len(predictions)} predictions for {len(frames)} frames")
+            else:
+                logger.warning(f"Classifier service returned status {response.status_code}")
         except Exception as e:
             logger.warning(f"Error calling classifier service: {e}")
-            return 0.0
+        return None
 
     async def generate_video_thumbnails(
         self,
@@ -294,76 +584,61 @@ class AutoFrameService:
             if not video_media or video_media.media_type.value != MediaType.VIDEO.value:
                 raise ValueError(f"Video media not found: {video_media_id}")
             
-            # Read video file
-            try:
-                file_data, _ = self.file_storage.read_file(str(video_media.file_path))
-                logger.debug(f"Read video file of size {len(file_data)} bytes for thumbnails")
-            except Exception as e:
-                raise FileNotFoundError(f"Video file not accessible: {e}")
+            # The stored video is read in place instead of copying it to a temp file
+            video_path = self.file_storage.get_local_path(str(video_media.file_path))
+            if not video_path:
+                raise FileNotFoundError(f"Video file not accessible: {video_media.file_path}")
+            # Open video and get basic info
+            cap = cv2.VideoCapture(video_path)
+            if not cap.isOpened():
+                raise ValueError("Could not open video file")
             
-            # Create temporary file
-            with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as video_temp:
-                video_temp.write(file_data)
-                video_temp_path = video_temp.name
-                logger.debug(f"Temporary video file created at {video_temp_path}")
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            duration_seconds = total_frames / fps if fps > 0 else 0
             
-            try:
-                # Open video and get basic info
-                cap = cv2.VideoCapture(video_temp_path)
-                if not cap.isOpened():
-                    raise ValueError("Could not open video file")
-                
-                fps = cap.get(cv2.CAP_PROP_FPS)
-                total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-                duration_seconds = total_frames / fps if fps > 0 else 0
+            logger.debug(f"Video info: {total_frames} frames, {fps} FPS, {duration_seconds:.2f}s")
+            
+            # Calculate thumbnail positions evenly distributed across video
+            thumbnails = []
+            for i in range(thumbnail_count):
+                # Calculate timestamp for this thumbnail
+                progress = i / (thumbnail_count - 1) if thumbnail_count > 1 else 0
+                timestamp_seconds = progress * duration_seconds
+                frame_number = int(timestamp_seconds * fps)
                 
-                logger.debug(f"Video info: {total_frames} frames, {fps} FPS, {duration_seconds:.2f}s")
+                # Seek to frame
+                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+                ret, frame = cap.read()
                 
-                # Calculate thumbnail positions evenly distributed across video
-                thumbnails = []
-                for i in range(thumbnail_count):
-                    # Calculate timestamp for this thumbnail
-                    progress = i / (thumbnail_count - 1) if thumbnail_count > 1 else 0
-                    timestamp_seconds = progress * duration_seconds
-                    frame_number = int(timestamp_seconds * fps)
+                if ret:
+                    # Resize frame for thumbnail (maintain aspect ratio)
+                    height, width = frame.shape[:2]
+                    thumbnail_width = 160  # Standard thumbnail width
+                    thumbnail_height = int((thumbnail_width * height) / width)
                     
-                    # Seek to frame
-                    cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
-                    ret, frame = cap.read()
+                    thumbnail_frame = cv2.resize(frame, (thumbnail_width, thumbnail_height))
                     
-                    if ret:
-                        # Resize frame for thumbnail (maintain aspect ratio)
-                        height, width = frame.shape[:2]
-                        thumbnail_width = 160  # Standard thumbnail width
-                        thumbnail_height = int((thumbnail_width * height) / width)
-                        
-                        thumbnail_frame = cv2.resize(frame, (thumbnail_width, thumbnail_height))
-                        
-                        # Encode as JPEG for efficient transmission
-                        _, encoded_frame = cv2.imencode('.jpg', thumbnail_frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
-                        frame_b64 = base64.b64encode(encoded_frame.tobytes()).decode('utf-8')
-                        
-                        thumbnails.append({
-                            'timestamp': timestamp_seconds,
-                            'frame_number': frame_number,
-                            'image_data': f"data:image/jpeg;base64,{frame_b64}",
-                            'width': thumbnail_width,
-                            'height': thumbnail_height
-                        })
-                        
-                        logger.debug(f"Generated thumbnail {i+1}/{thumbnail_count} at {timestamp_seconds:.2f}s")
-                    else:
-                        logger.warning(f"Could not extract frame at position {frame_number}")
-                
-                cap.release()
-                logger.info(f"Generated {len(thumbnails)} thumbnails for video {video_media_id}")
-                
-                return thumbnails
-                
-            finally:
-                # Cleanup temporary file
-                if os.path.exists(video_temp_path):
-                    os.unlink(video_temp_path)
+                    # Encode as JPEG for efficient transmission
+                    _, encoded_frame = cv2.imencode('.jpg', thumbnail_frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
+                    frame_b64 = base64.b64encode(encoded_frame.tobytes()).decode('utf-8')
+                    
+                    thumbnails.append({
+                        'timestamp': timestamp_seconds,
+                        'frame_number': frame_number,
+                        'image_data': f"data:image/jpeg;base64,{frame_b64}",
+                        'width': thumbnail_width,
+                        'height': thumbnail_height
+                    })
+                    
+                    logger.debug(f"Generated thumbnail {i+1}/{thumbnail_count} at {timestamp_seconds:.2f}s")
+                else:
+                    logger.warning(f"Could not extract frame at position {frame_number}")
+            
+            cap.release()
+            logger.info(f"Generated {len(thumbnails)} thumbnails for video {video_media_id}")
+            
+            return thumbnails
                     
         except Exception as e:
             logger.error(f"Error generating video thumbnails for {video_media_id}: {e}")
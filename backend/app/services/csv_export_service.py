@@ -3,13 +3,14 @@ CSV export service for downloading annotation data.
 """
 
 import csv
-import io
 import logging
+import os
 from datetime import datetime
+from functools import lru_cache
 from typing import Generator
 
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, func
 
 from app.models.picture_classification_annotation import PictureClassificationAnnotation
 from app.models.picture_bb_annotation import PictureBBAnnotation
@@ -21,6 +22,39 @@ from app.schemas.csv_export import CSVExportRequest, CSVExportInfo
 logger = logging.getLogger(__name__)
 
 
+# Rows fetched per round-trip from the server-side cursor while streaming
+QUERY_BATCH_SIZE = 1000
+# CSV rows collected before they are joined and flushed as one response chunk
+CSV_ROWS_PER_CHUNK = 500
+
+# Map MIME types to file extensions
+MIME_TO_EXTENSION = {
+    'image/jpeg': '.jpg',
+    'image/jpg': '.jpg',
+    'image/png': '.png',
+    'image/gif': '.gif',
+    'image/bmp': '.bmp',
+    'image/tiff': '.tiff',
+    'image/webp': '.webp',
+    'video/mp4': '.mp4',
+    'video/avi': '.avi',
+    'video/quicktime': '.mov',
+    'video/webm': '.webm',
+    'video/x-msvideo': '.avi'
+}
+
+
+class _ListSink:
+    """Write target for csv.writer that collects rows in a list instead of a StringIO"""
+    __slots__ = ('buf',)
+
+    def __init__(self):
+        self.buf: list[str] = []
+
+    def write(self, s: str) -> None:
+        self.buf.append(s)
+
+
 class CSVExportService:
     """Service class for exporting annotations to CSV format"""
 
@@ -33,8 +67,11 @@ class CSVExportService:
                     f"include_soft_deleted={request.include_soft_deleted}")
 
         # Build query for classification annotations
+        # Select only the exported columns so rows arrive as plain tuples
         query = self.db.query(
-            PictureClassificationAnnotation,
+            PictureClassificationAnnotation.media_type,
+            PictureClassificationAnnotation.usefulness,
+            PictureClassificationAnnotation.created_at,
             Media.filename,
             Media.mime_type,
             Media.file_path
@@ -63,9 +100,11 @@ class CSVExportService:
         # Order by creation date for consistent output
         query = query.order_by(PictureClassificationAnnotation.created_at)
 
-        # Get results and count
-        results = query.all()
-        total_records = len(results)
+        # Count separately so rows can be streamed with a server-side cursor
+        total_records = query.order_by(None).with_entities(
+            func.count(PictureClassificationAnnotation.id)
+        ).scalar() or 0
+        results = query.yield_per(QUERY_BATCH_SIZE)
 
         # Generate filename
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -93,8 +132,15 @@ class CSVExportService:
                     f"include_soft_deleted={request.include_soft_deleted}, include_hidden={request.include_hidden_annotations}")
 
         # Build query for bounding box annotations
+        # Select only the exported columns so rows arrive as plain tuples
         query = self.db.query(
-            PictureBBAnnotation,
+            PictureBBAnnotation.media_type,
+            PictureBBAnnotation.bb_class,
+            PictureBBAnnotation.x_min,  # Use original pixel coordinates
+            PictureBBAnnotation.y_min,
+            PictureBBAnnotation.width,
+            PictureBBAnnotation.height,
+            PictureBBAnnotation.created_at,
             Media.filename,
             Media.mime_type,
             Media.file_path
@@ -129,9 +175,11 @@ class CSVExportService:
         # Order by creation date for consistent output
         query = query.order_by(PictureBBAnnotation.created_at)
 
-        # Get results and count
-        results = query.all()
-        total_records = len(results)
+        # Count separately so rows can be streamed with a server-side cursor
+        total_records = query.order_by(None).with_entities(
+            func.count(PictureBBAnnotation.id)
+        ).scalar() or 0
+        results = query.yield_per(QUERY_BATCH_SIZE)
 
         # Generate filename
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -155,90 +203,77 @@ class CSVExportService:
 
     def _generate_classification_csv(self, results) -> Generator[str, None, None]:
         """Generate CSV content for classification annotations"""
-        # Create string buffer for CSV writing
-        output = io.StringIO()
-        writer = csv.writer(output)
+        # Collect written rows in a list buffer
+        sink = _ListSink()
+        writer = csv.writer(sink)
 
         # Write header
         header = ["filename", "media_type", "usefulness", "annotation_date"]
         writer.writerow(header)
-        yield output.getvalue()
-        output.seek(0)
-        output.truncate(0)
 
-        # Write data rows
-        for annotation, original_filename, mime_type, file_path in results:
+        # Write data rows, flushing the buffer every CSV_ROWS_PER_CHUNK rows
+        for media_type, usefulness, created_at, original_filename, mime_type, file_path in results:
             # Create a proper filename using file_path (storage ID) and mime_type extension
-            csv_filename = self._create_csv_filename(str(file_path), str(mime_type), str(original_filename))
+            csv_filename = self._create_csv_filename(file_path, mime_type, original_filename)
             
             row = [
                 csv_filename,
-                str(annotation.media_type.value),  # type: ignore
-                int(annotation.usefulness),  # type: ignore
-                annotation.created_at.strftime("%Y-%m-%d %H:%M:%S")  # type: ignore
+                media_type.value,
+                usefulness,
+                created_at.strftime("%Y-%m-%d %H:%M:%S")
             ]
             writer.writerow(row)
-            yield output.getvalue()
-            output.seek(0)
-            output.truncate(0)
+            if len(sink.buf) >= CSV_ROWS_PER_CHUNK:
+                chunk = ''.join(sink.buf)
+                sink.buf.clear()
+                yield chunk
+
+        if sink.buf:
+            yield ''.join(sink.buf)
 
     def _generate_bounding_box_csv(self, results) -> Generator[str, None, None]:
         """Generate CSV content for bounding box annotations"""
-        # Create string buffer for CSV writing
-        output = io.StringIO()
-        writer = csv.writer(output)
+        # Collect written rows in a list buffer
+        sink = _ListSink()
+        writer = csv.writer(sink)
 
         # Write header
         header = ["filename", "media_type", "bb_class", "xmin", "ymin", "width", "height", "annotation_date"]
         writer.writerow(header)
-        yield output.getvalue()
-        output.seek(0)
-        output.truncate(0)
 
-        # Write data rows
-        for annotation, original_filename, mime_type, file_path in results:
+        # Write data rows, flushing the buffer every CSV_ROWS_PER_CHUNK rows
+        for media_type, bb_class, x_min, y_min, width, height, created_at, original_filename, mime_type, file_path in results:
             # Create a proper filename using file_path (storage ID) and mime_type extension
-            csv_filename = self._create_csv_filename(str(file_path), str(mime_type), str(original_filename))
+            csv_filename = self._create_csv_filename(file_path, mime_type, original_filename)
             
             row = [
                 csv_filename,
-                str(annotation.media_type.value),  # type: ignore
-                str(annotation.bb_class),  # type: ignore
-                float(annotation.x_min),  # type: ignore - Use original pixel coordinates
-                float(annotation.y_min),  # type: ignore
-                float(annotation.width),  # type: ignore
-                float(annotation.height),  # type: ignore
-                annotation.created_at.strftime("%Y-%m-%d %H:%M:%S")  # type: ignore
+                media_type.value,
+                bb_class,
+                x_min,
+                y_min,
+                width,
+                height,
+                created_at.strftime("%Y-%m-%d %H:%M:%S")
             ]
             writer.writerow(row)
-            yield output.getvalue()
-            output.seek(0)
-            output.truncate(0)
+            if len(sink.buf) >= CSV_ROWS_PER_CHUNK:
+                chunk = ''.join(sink.buf)
+                sink.buf.clear()
+                yield chunk
 
-    def _create_csv_filename(self, file_path: str, mime_type: str, original_filename: str) -> str:
+        if sink.buf:
+            yield ''.join(sink.buf)
+
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _create_csv_filename(file_path: str, mime_type: str, original_filename: str) -> str:
         """Create a filename for CSV export using file_path (storage ID) and proper extension"""
-        # Map MIME types to file extensions
-        mime_to_extension = {
-            'image/jpeg': '.jpg',
-            'image/jpg': '.jpg', 
-            'image/png': '.png',
-            'image/gif': '.gif',
-            'image/bmp': '.bmp',
-            'image/tiff': '.tiff',
-            'image/webp': '.webp',
-            'video/mp4': '.mp4',
-            'video/avi': '.avi',
-            'video/quicktime': '.mov',
-            'video/webm': '.webm',
-            'video/x-msvideo': '.avi'
-        }
-        
         # Get the extension from mime_type, fallback to original filename extension
-        extension = mime_to_extension.get(mime_type.lower())
+        extension = MIME_TO_EXTENSION.get(mime_type.lower())
         if not extension:
             # Extract extension from original filename as fallback
-            import os
             extension = os.path.splitext(original_filename)[1] or '.bin'
         
         # Use file_path (which is the storage ID/anonymized name) + proper extension
-        return f"{file_path}{extension}"
\ No newline at end of file
+        return f"{file_path}{extension}"
@@ -4,11 +4,12 @@ Doctor service for doctor profile management operations.
 
 
 import logging
-from typing import Optional, cast
+from typing import Optional
 from uuid import UUID
 
-from sqlalchemy.orm import Session
-from sqlalchemy import Column
+from sqlalchemy.orm import Session, aliased, raiseload
+from sqlalchemy import exists, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from app.models.doctor_profile import DoctorProfile as DoctorProfileModel, DoctorProfileStatus
 from app.models.user_role import UserRole, UserRoleType
@@ -30,27 +31,29 @@ class DoctorService:
         profile_data: DoctorProfileCreate
     ) -> DoctorProfileSchema:
         """Create a new doctor profile"""
-        existing_profile = self.db.query(DoctorProfileModel).filter(
-            DoctorProfileModel.matriculation_id == profile_data.matriculation_id
-        ).first()
-        if existing_profile:
-            raise ValueError("Matriculation ID already exists")
-        db_profile = DoctorProfileModel(
+        # The unique index decides duplicates in the same statement as the insert
+        stmt = pg_insert(DoctorProfileModel).values(
             user_id=user_id,
             matriculation_id=profile_data.matriculation_id,
             legal_name=profile_data.legal_name,
             specialization=profile_data.specialization,
             status=DoctorProfileStatus.PENDING.value
-        )
-        self.db.add(db_profile)
+        ).on_conflict_do_nothing(
+            index_elements=[DoctorProfileModel.matriculation_id]
+        ).returning(DoctorProfileModel)
+        db_profile = self.db.execute(stmt).scalar_one_or_none()
+        if db_profile is None:
+            self.db.rollback()
+            raise ValueError("Matriculation ID already exists")
+        profile = DoctorProfileSchema.model_validate(db_profile)
         self.db.commit()
-        self.db.refresh(db_profile)
         logger.info("📝 Doctor profile created for user %s", user_id)
-        return DoctorProfileSchema.model_validate(db_profile)
+        return profile
 
     def get_doctor_profile_by_user_id(self, user_id: UUID) -> Optional[DoctorProfileSchema]:
         """Get doctor profile by user ID"""
-        profile = self.db.query(DoctorProfileModel).filter(
+        # The schema only reads columns; fail loudly if a relationship ever lazy-loads
+        profile = self.db.query(DoctorProfileModel).options(raiseload("*")).filter(
             DoctorProfileModel.user_id == user_id
         ).first()
         return DoctorProfileSchema.model_validate(profile) if profile else None
@@ -61,32 +64,46 @@ class DoctorService:
         profile_data: DoctorProfileCreate
     ) -> Optional[DoctorProfileSchema]:
         """Update an existing doctor profile"""
-        profile = self.db.query(DoctorProfileModel).filter(
-            DoctorProfileModel.user_id == user_id
-        ).first()
-        if not profile:
-            return None
-        if profile_data.matriculation_id != profile.matriculation_id:
-            existing_profile = self.db.query(DoctorProfileModel).filter(
-                DoctorProfileModel.matriculation_id == profile_data.matriculation_id,
-                DoctorProfileModel.user_id != user_id
+        other_profile = aliased(DoctorProfileModel)
+        matriculation_taken = exists().where(
+            other_profile.matriculation_id == profile_data.matriculation_id,
+            other_profile.user_id != user_id
+        )
+        stmt = update(DoctorProfileModel).where(
+            DoctorProfileModel.user_id == user_id,
+            ~matriculation_taken
+        ).values(
+            matriculation_id=profile_data.matriculation_id,
+            legal_name=profile_data.legal_name,
+            specialization=profile_data.specialization,
+            status=DoctorProfileStatus.PENDING.value,
+            notes=None
+        ).returning(DoctorProfileModel)
+        profile = self.db.execute(stmt).scalar_one_or_none()
+        if profile is None:
+            self.db.rollback()
+            # Nothing updated: either there is no profile or the ID is taken
+            profile_exists = self.db.query(DoctorProfileModel.id).filter(
+                DoctorProfileModel.user_id == user_id
             ).first()
-            if existing_profile:
-                raise ValueError("Matriculation ID already exists")
-        profile.matriculation_id = cast(Column[str], profile_data.matriculation_id)
-        profile.legal_name = cast(Column[str], profile_data.legal_name)
-        profile.specialization = cast(Column[str], profile_data.specialization)
-        profile.status = cast(Column[str], DoctorProfileStatus.PENDING.value)
-        profile.notes = cast(Column[str], None)
+            if not profile_exists:
+                return None
+            raise ValueError("Matriculation ID already exists")
+        updated_profile = DoctorProfileSchema.model_validate(profile)
         self.db.commit()
-        self.db.refresh(profile)
         logger.info("📝 Doctor profile updated for user %s", user_id)
-        return DoctorProfileSchema.model_validate(profile)
+        return updated_profile
 
     def is_doctor(self, user_id: UUID) -> bool:
-        """Check if user has doctor role"""
-        doctor_role = self.db.query(UserRole).filter(
-            UserRole.user_id == user_id,
-            UserRole.role == UserRoleType.DOCTOR
-        ).first()
-        return doctor_role is not None
+        """Check if user has doctor role (memoized for the lifetime of the session)"""
+        # The session is request-scoped, so this cache lives for one request;
+        # role writes in AdminService drop it
+        role_cache = self.db.info.setdefault("role_cache", {})
+        cache_key = (user_id, UserRoleType.DOCTOR)
+        if cache_key not in role_cache:
+            doctor_role = self.db.query(UserRole.id).filter(
+                UserRole.user_id == user_id,
+                UserRole.role == UserRoleType.DOCTOR
+            ).first()
+            role_cache[cache_key] = doctor_role is not None
+        return role_cache[cache_key]
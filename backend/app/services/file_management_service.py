@@ -3,10 +3,14 @@ File management service for storage statistics and hard delete operations.
 """
 
 import logging
+import queue
+import threading
 import time
-from typing import cast
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Optional, cast
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from sqlalchemy import BigInteger, func, case, select, or_, delete
+from sqlalchemy.exc import OperationalError
 
 from app.models.study import Study
 from app.models.media import Media
@@ -16,40 +20,108 @@ from app.models.picture_bb_annotation import PictureBBAnnotation
 from app.models.picture_bb_prediction import PictureBBPrediction
 from app.models.frame import Frame
 from app.schemas.file_management import FileManagementStats, HardDeleteSummary
+from app.services.media_service import MediaService
 from app.core.file_storage import FileStorageService
+from app.core.cache import RedisCache
 
 logger = logging.getLogger(__name__)
 
+# The delete transaction runs SERIALIZABLE and is retried on conflicts (SQLSTATE 40001)
+HARD_DELETE_MAX_ATTEMPTS = 3
+SERIALIZATION_FAILURE = "40001"
+
+# System-wide storage statistics are polled by the admin dashboard; serve them from
+# Redis for a short while instead of rescanning media on every poll
+STORAGE_STATS_CACHE_KEY = "file_management:storage_statistics"
+STORAGE_STATS_CACHE_TTL = 15
+
+# Minimum wall-clock gap between running progress updates
+PROGRESS_MIN_INTERVAL_SECONDS = 0.1
+
+# Pending progress updates kept for a slow callback before the oldest are dropped
+PROGRESS_QUEUE_SIZE = 32
+
+# Physical unlinks are I/O-bound, so a wide pool hides per-file latency
+FILE_DELETE_WORKERS = 32
+
+
+class _ProgressEmitter:
+    """Forwards progress payloads to a callback from a background thread"""
+
+    _STOP = object()
+
+    def __init__(self, callback: Callable[[dict], None]):
+        self._callback = callback
+        self._queue: queue.Queue = queue.Queue(maxsize=PROGRESS_QUEUE_SIZE)
+        self._thread = threading.Thread(target=self._drain, daemon=True)
+        self._thread.start()
+
+    def emit(self, payload: dict):
+        """Queue a payload without blocking; the oldest pending one is dropped when full"""
+        while True:
+            try:
+                self._queue.put_nowait(payload)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def close(self):
+        """Deliver everything still queued, then stop the worker"""
+        self._queue.put(self._STOP)
+        self._thread.join()
+
+    def _drain(self):
+        while True:
+            payload = self._queue.get()
+            if payload is self._STOP:
+                return
+            try:
+                self._callback(payload)
+            except Exception as e:
+                logger.warning("⚠️ Progress callback failed: %s", e)
+
 
 class FileManagementService:
     """Service class for file management operations"""
 
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, cache: Optional[RedisCache] = None):
         self.db = db
+        self.cache = cache
         self.file_storage = FileStorageService()
 
     def get_storage_statistics(self) -> FileManagementStats:
         """
         Calculate system-wide storage statistics including active and soft-deleted files.
         
+        Results are cached for STORAGE_STATS_CACHE_TTL seconds when a cache is configured.
+        
         Returns:
             FileManagementStats: Complete statistics about file storage usage
         """
-        logger.debug("📊 Calculating system-wide storage statistics")
-
-        # Get counts and storage for active files
-        active_count = self.db.query(func.count(Media.id)).filter(Media.is_active.is_(True)).scalar() or 0
-        active_bytes = self.db.query(func.coalesce(func.sum(Media.file_size), 0)).filter(Media.is_active.is_(True)).scalar() or 0
+        if self.cache:
+            cached = self.cache.get(STORAGE_STATS_CACHE_KEY)
+            if cached:
+                logger.debug("📊 Storage statistics served from cache")
+                return FileManagementStats.model_validate_json(cached)
 
-        # Get counts and storage for soft-deleted files
-        soft_deleted_count = self.db.query(func.count(Media.id)).filter(Media.is_active.is_(False)).scalar() or 0
-        soft_deleted_bytes = self.db.query(func.coalesce(func.sum(Media.file_size), 0)).filter(Media.is_active.is_(False)).scalar() or 0
+        logger.debug("📊 Calculating system-wide storage statistics")
 
-        # Ensure values are integers
-        active_count = int(active_count)
-        active_bytes = int(active_bytes)
-        soft_deleted_count = int(soft_deleted_count)
-        soft_deleted_bytes = int(soft_deleted_bytes)
+        def total(condition, value):
+            # Coalesced and cast server-side so the driver returns plain ints, not NULL/Decimal
+            return func.coalesce(func.sum(case((condition, value), else_=0)), 0).cast(BigInteger)
+
+        # Get counts and storage for active and soft-deleted files in a single scan
+        active_count, active_bytes, soft_deleted_count, soft_deleted_bytes = self.db.execute(
+            select(
+                total(Media.is_active.is_(True), 1),
+                total(Media.is_active.is_(True), Media.file_size),
+                total(Media.is_active.is_(False), 1),
+                total(Media.is_active.is_(False), Media.file_size)
+            )
+        ).one()
 
         # Calculate totals
         total_count = active_count + soft_deleted_count
@@ -96,6 +168,9 @@ class FileManagementService:
             total_count, total_mb, active_count, active_mb, soft_deleted_count, soft_deleted_mb
         )
 
+        if self.cache:
+            self.cache.set(STORAGE_STATS_CACHE_KEY, stats.model_dump_json().encode(), ttl=STORAGE_STATS_CACHE_TTL)
+
         return stats
 
     def get_soft_deleted_items(self) -> dict:
@@ -107,62 +182,52 @@ class FileManagementService:
         """
         logger.debug("🔍 Analyzing soft-deleted items for cleanup")
 
-        # Count soft-deleted studies
-        soft_deleted_studies = self.db.query(func.count(Study.id)).filter(
-            Study.is_active.is_(False)
-        ).scalar() or 0
-
-        # Count soft-deleted media (including those belonging to soft-deleted studies)
-        soft_deleted_media = self.db.query(func.count(Media.id)).filter(
-            Media.is_active.is_(False)
-        ).scalar() or 0
-
-        # Count media belonging to soft-deleted studies (these will be cascade deleted)
-        media_in_deleted_studies = self.db.query(func.count(Media.id)).join(
-            Study, Media.study_id == Study.id
-        ).filter(Study.is_active.is_(False)).scalar() or 0
-
-        # Count annotations and predictions that would be deleted
-        # (these are cascade deleted when media is deleted)
-        classification_annotations = self.db.query(func.count(PictureClassificationAnnotation.id)).join(
-            Media, PictureClassificationAnnotation.media_id == Media.id
-        ).filter(
-            and_(
-                Media.is_active.is_(False)
-            )
-        ).scalar() or 0
-
-        classification_predictions = self.db.query(func.count(PictureClassificationPrediction.id)).join(
-            Media, PictureClassificationPrediction.media_id == Media.id
-        ).filter(
-            and_(
-                Media.is_active.is_(False)
-            )
-        ).scalar() or 0
+        # Media rows that are soft-deleted themselves; every dependent count
+        # below is taken against this set in the same round-trip
+        deleted_media = (
+            select(Media.id)
+            .where(Media.is_active.is_(False))
+            .cte("deleted_media")
+        )
 
-        bb_annotations = self.db.query(func.count(PictureBBAnnotation.id)).join(
-            Media, PictureBBAnnotation.media_id == Media.id
-        ).filter(
-            and_(
-                Media.is_active.is_(False)
+        def count_in_deleted_media(model, media_column):
+            return (
+                select(func.count(model.id))
+                .where(media_column.in_(select(deleted_media.c.id)))
+                .scalar_subquery()
             )
-        ).scalar() or 0
 
-        bb_predictions = self.db.query(func.count(PictureBBPrediction.id)).join(
-            Media, PictureBBPrediction.media_id == Media.id
-        ).filter(
-            and_(
-                Media.is_active.is_(False)
-            )
-        ).scalar() or 0
-
-        frames = self.db.query(func.count(Frame.id)).join(
-            Media, Frame.video_media_id == Media.id
-        ).filter(
-            and_(
-                Media.is_active.is_(False)
-            )
-        ).scalar() or 0
+        row = self.db.execute(select(
+            # Count soft-deleted studies
+            select(func.count(Study.id))
+            .where(Study.is_active.is_(False))
+            .scalar_subquery(),
+            # Count soft-deleted media (including those belonging to soft-deleted studies)
+            select(func.count(deleted_media.c.id)).scalar_subquery(),
+            # Count media belonging to soft-deleted studies (these will be cascade deleted)
+            select(func.count(Media.id))
+            .join(Study, Media.study_id == Study.id)
+            .where(Study.is_active.is_(False))
+            .scalar_subquery(),
+            # Count annotations and predictions that would be deleted
+            # (these are cascade deleted when media is deleted)
+            count_in_deleted_media(PictureClassificationAnnotation, PictureClassificationAnnotation.media_id),
+            count_in_deleted_media(PictureClassificationPrediction, PictureClassificationPrediction.media_id),
+            count_in_deleted_media(PictureBBAnnotation, PictureBBAnnotation.media_id),
+            count_in_deleted_media(PictureBBPrediction, PictureBBPrediction.media_id),
+            count_in_deleted_media(Frame, Frame.video_media_id)
+        )).one()
+
+        (
+            soft_deleted_studies,
+            soft_deleted_media,
+            media_in_deleted_studies,
+            classification_annotations,
+            classification_predictions,
+            bb_annotations,
+            bb_predictions,
+            frames
+        ) = (int(value or 0) for value in row)
 
         result = {
             "soft_deleted_studies": soft_deleted_studies,
@@ -185,31 +250,6 @@ class FileManagementService:
 
         return result
 
-    def _get_soft_deleted_media_file_paths(self) -> list[tuple[str, int]]:
-        """
-        Get file paths and sizes of all media that will be hard deleted.
-        
-        Returns:
-            list[tuple[str, int]]: list of (file_path, file_size) tuples
-        """
-        # Get soft-deleted media files
-        soft_deleted_media = self.db.query(Media.file_path, Media.file_size).filter(
-            Media.is_active.is_(False)
-        ).all()
-
-        # Get media files from soft-deleted studies
-        media_from_deleted_studies = self.db.query(Media.file_path, Media.file_size).join(
-            Study, Media.study_id == Study.id
-        ).filter(Study.is_active.is_(False)).all()
-
-        # Combine and deduplicate based on file_path
-        all_files = {}
-        for file_path, file_size in soft_deleted_media + media_from_deleted_studies:
-            if file_path not in all_files:
-                all_files[file_path] = file_size
-
-        return list(all_files.items())
-
     def validate_hard_delete_request(self, confirmation_text: str) -> bool:
         """
         Validate that the confirmation text is exactly 'DELETE'.
@@ -222,15 +262,65 @@ class FileManagementService:
         """
         return confirmation_text == "DELETE"
 
+    def _delete_soft_deleted_rows(self) -> tuple[list[tuple[str, int]], int, int]:
+        """
+        Delete soft-deleted media and studies in a single SERIALIZABLE transaction.
+
+        Returns:
+            tuple: (file_path, file_size) list to unlink, deleted media count, deleted studies count
+        """
+        # Must be the first statement of the transaction
+        self.db.connection(execution_options={"isolation_level": "SERIALIZABLE"})
+
+        # Delete soft-deleted media and all media of soft-deleted studies
+        # in one statement (FK ON DELETE CASCADE removes frames/annotations/predictions);
+        # RETURNING hands back the files to unlink without a separate SELECT
+        deleted_study_ids = select(Study.id).where(Study.is_active.is_(False))
+        deleted_media = self.db.execute(
+            delete(Media)
+            .where(
+                or_(
+                    Media.is_active.is_(False),
+                    Media.study_id.in_(deleted_study_ids)
+                )
+            )
+            .returning(Media.file_path, Media.file_size)
+            .execution_options(synchronize_session=False)
+        ).all()
+        deleted_media_count = len(deleted_media)
+
+        # Keep one entry per file_path
+        files_to_delete = list({file_path: file_size for file_path, file_size in deleted_media}.items())
+
+        # Delete soft-deleted studies, now without any media left
+        deleted_studies_count = self.db.execute(
+            delete(Study)
+            .where(Study.is_active.is_(False))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+        self.db.commit()
+
+        # Deleted rows no longer count towards storage; drop the cached snapshot
+        # and the per-doctor totals used by upload quota checks
+        if self.cache:
+            self.cache.delete(STORAGE_STATS_CACHE_KEY)
+            MediaService.invalidate_all_storage_caches(self.cache)
+
+        return files_to_delete, deleted_media_count, deleted_studies_count
+
     def hard_delete_soft_deleted_items(self, progress_callback=None) -> HardDeleteSummary:
         """
         Permanently delete all soft-deleted studies and media.
         
         This method:
-        1. Deletes all soft-deleted studies (cascade deletes associated media)
-        2. Deletes remaining soft-deleted media records  
-        3. Removes physical files from disk
-        4. Provides progress updates via callback
+        1. Bulk deletes soft-deleted media and media of soft-deleted studies
+           (database cascades remove frames, annotations and predictions)
+        2. Bulk deletes soft-deleted studies
+           (steps 1-2 run in one SERIALIZABLE transaction, retried on conflicts)
+        3. Removes physical files from disk in parallel once the deletes are committed
+        4. Provides progress updates via callback, delivered from a background
+           thread so a slow callback never stalls the deletion
         
         Args:
             progress_callback: Optional function to call with progress updates
@@ -238,6 +328,18 @@ class FileManagementService:
         Returns:
             HardDeleteSummary: Summary of the deletion operation
         """
+        if not progress_callback:
+            return self._hard_delete_soft_deleted_items(None)
+
+        emitter = _ProgressEmitter(progress_callback)
+        try:
+            return self._hard_delete_soft_deleted_items(emitter.emit)
+        finally:
+            # Flush queued updates so the terminal event lands before we return
+            emitter.close()
+
+    def _hard_delete_soft_deleted_items(self, progress_callback) -> HardDeleteSummary:
+        """Run the hard delete, reporting progress through progress_callback"""
         start_time = time.time()
         errors = []
         deleted_studies_count = 0
@@ -245,29 +347,55 @@ class FileManagementService:
         deleted_files_count = 0
         freed_storage_bytes = 0  # Initialize as plain int
 
+        last_emit = {"time": 0.0, "processed": -1}
+
         def update_progress(message: str, processed: int, total: int):
-            if progress_callback:
-                progress_callback({
-                    "status": "running",
-                    "progress": processed / total if total > 0 else 0,
-                    "processed_items": processed,
-                    "total_items": total,
-                    "current_operation": message,
-                    "errors": errors
-                })
+            if not progress_callback:
+                return
+            # Forward at most every PROGRESS_MIN_INTERVAL_SECONDS or every 1% of the work;
+            # the terminal completed/failed events are always sent below
+            now = time.monotonic()
+            if (
+                now - last_emit["time"] < PROGRESS_MIN_INTERVAL_SECONDS
+                and processed - last_emit["processed"] < max(1, total // 100)
+                and processed < total
+            ):
+                return
+            last_emit["time"] = now
+            last_emit["processed"] = processed
+            progress_callback({
+                "status": "running",
+                "progress": processed / total if total > 0 else 0,
+                "processed_items": processed,
+                "total_items": total,
+                "current_operation": message,
+                "errors": errors
+            })
 
         try:
             logger.info("🗑️ Starting hard delete operation for all soft-deleted items")
 
-            # Step 1: Get all items to be deleted for progress tracking
-            analysis = self.get_soft_deleted_items()
-            total_operations = (
-                analysis["soft_deleted_studies"] + 
-                analysis["soft_deleted_media"] + 
-                analysis["media_in_deleted_studies"]
-            )
-            
-            if total_operations == 0:
+            processed_count = 0
+            total_operations = 0
+
+            # Steps 1-3: harvest file paths and delete rows in one SERIALIZABLE
+            # transaction, so nothing soft-deleted in between is missed or double-counted
+            update_progress("Deleting soft-deleted studies and media...", processed_count, total_operations)
+
+            for attempt in range(1, HARD_DELETE_MAX_ATTEMPTS + 1):
+                try:
+                    files_to_delete, deleted_media_count, deleted_studies_count = (
+                        self._delete_soft_deleted_rows()
+                    )
+                    break
+                except OperationalError as e:
+                    self.db.rollback()
+                    if getattr(e.orig, "pgcode", None) != SERIALIZATION_FAILURE or attempt == HARD_DELETE_MAX_ATTEMPTS:
+                        raise
+                    logger.warning("⚠️ Hard delete transaction hit a serialization conflict, retrying (%d/%d)",
+                                   attempt, HARD_DELETE_MAX_ATTEMPTS)
+
+            if deleted_media_count == 0 and deleted_studies_count == 0:
                 logger.info("✅ No soft-deleted items found to delete")
                 return HardDeleteSummary(
                     deleted_studies_count=0,
@@ -279,64 +407,33 @@ class FileManagementService:
                     operation_duration_seconds=time.time() - start_time
                 )
 
-            processed_count = 0
-            
-            # Step 2: Delete soft-deleted studies (CASCADE deletes associated media/annotations)
-            update_progress("Deleting soft-deleted studies...", processed_count, total_operations)
-            
-            soft_deleted_studies = self.db.query(Study).filter(Study.is_active.is_(False)).all()
-            for study in soft_deleted_studies:
-                try:
-                    # Get media files from this study before deletion
-                    study_media_files = self.db.query(Media.file_path, Media.file_size).filter(
-                        Media.study_id == study.id
-                    ).all()
-                    
-                    # Delete the study (CASCADE will handle media/annotations/predictions)
-                    self.db.delete(study)
-                    deleted_studies_count += 1
-                    deleted_media_count += len(study_media_files)
-                    
-                    # Delete physical files
-                    for file_path, file_size in study_media_files:
-                        try:
-                            if self.file_storage.delete_file(str(file_path)):
-                                deleted_files_count += 1
-                                freed_storage_bytes += int(file_size) if file_size else 0
-                        except Exception as e:
-                            errors.append(f"Failed to delete file {file_path}: {str(e)}")
-                    
-                    processed_count += 1
-                    update_progress(f"Deleted study {study.alias}", processed_count, total_operations)
-                    
-                except Exception as e:
-                    errors.append(f"Failed to delete study {study.alias}: {str(e)}")
-                    
-            # Step 3: Delete remaining soft-deleted media records
-            update_progress("Deleting remaining soft-deleted media...", processed_count, total_operations)
-            
-            remaining_soft_deleted_media = self.db.query(Media).filter(Media.is_active.is_(False)).all()
-            for media in remaining_soft_deleted_media:
-                try:
-                    # Delete physical file
+            processed_count = deleted_media_count + deleted_studies_count
+            total_operations = processed_count + len(files_to_delete)
+
+            # Step 4: Remove physical files in parallel; the session stays on this thread
+            update_progress("Deleting files from storage...", processed_count, total_operations)
+
+            # Sum the RETURNING sizes once in C; only files that are not removed are
+            # subtracted below, which is the rare path
+            freed_storage_bytes = sum(file_size or 0 for _, file_size in files_to_delete)
+
+            with ThreadPoolExecutor(max_workers=FILE_DELETE_WORKERS) as executor:
+                futures = {
+                    executor.submit(self.file_storage.delete_file, str(file_path)): (file_path, file_size)
+                    for file_path, file_size in files_to_delete
+                }
+                for future in as_completed(futures):
+                    file_path, file_size = futures[future]
                     try:
-                        if self.file_storage.delete_file(str(media.file_path)):
+                        if future.result():
                             deleted_files_count += 1
-                            freed_storage_bytes += media.file_size
+                        else:
+                            freed_storage_bytes -= file_size or 0
                     except Exception as e:
-                        errors.append(f"Failed to delete file {media.file_path}: {str(e)}")
-                    
-                    # Delete media record (CASCADE handles annotations/predictions)
-                    self.db.delete(media)
-                    deleted_media_count += 1
+                        freed_storage_bytes -= file_size or 0
+                        errors.append(f"Failed to delete file {file_path}: {str(e)}")
                     processed_count += 1
-                    update_progress(f"Deleted media {media.filename}", processed_count, total_operations)
-                    
-                except Exception as e:
-                    errors.append(f"Failed to delete media {media.filename}: {str(e)}")
-
-            # Commit all database changes
-            self.db.commit()
+                    update_progress(f"Deleted file {file_path}", processed_count, total_operations)
             
             operation_duration = time.time() - start_time
             freed_storage_mb = freed_storage_bytes / (1024 * 1024)
@@ -4,33 +4,107 @@ Frame service for video frame extraction and management.
 
 
 import logging
-import tempfile
 import os
+import tempfile
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from typing import Optional, cast
 from uuid import UUID
 
+from sqlalchemy import and_, delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from PIL import Image as PILImage
 import ffmpeg
 
 from app.models.media import Media, MediaType, UploadStatus
 from app.models.frame import Frame
+from app.models.study import Study
 from app.models.picture_bb_annotation import PictureBBAnnotation
 from app.models.picture_classification_annotation import PictureClassificationAnnotation
 from app.schemas.frame import FrameCreate, VideoMetadata
 from app.services.media_service import MediaService
 from app.core.file_storage import FileStorageService
+from app.core.config import settings
+from app.core.ffmpeg_pool import run_ffmpeg_job
+from app.core.cache import RedisCache
 
 
 logger = logging.getLogger(__name__)
 
+# JPEG start-of-frame markers (baseline, progressive, lossless...); 0xC4, 0xC8 and 0xCC are not frames
+_JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def read_jpeg_dimensions(data: bytes) -> Optional[tuple[int, int]]:
+    """Read (width, height) from a JPEG's SOF segment without decoding the image"""
+    if data[:2] != b'\xff\xd8':
+        return None
+    offset = 2
+    while offset + 4 <= len(data):
+        if data[offset] != 0xFF:
+            return None
+        marker = data[offset + 1]
+        if marker == 0xFF:  # fill byte
+            offset += 1
+            continue
+        segment_length = int.from_bytes(data[offset + 2:offset + 4], 'big')
+        if marker in _JPEG_SOF_MARKERS:
+            if offset + 9 > len(data):
+                return None
+            height = int.from_bytes(data[offset + 5:offset + 7], 'big')
+            width = int.from_bytes(data[offset + 7:offset + 9], 'big')
+            return width, height
+        offset += 2 + segment_length
+    return None
+
+
+def read_webp_dimensions(data: bytes) -> Optional[tuple[int, int]]:
+    """Read (width, height) from a WebP's VP8/VP8L/VP8X header without decoding the image"""
+    if len(data) < 30 or data[:4] != b'RIFF' or data[8:12] != b'WEBP':
+        return None
+    chunk = data[12:16]
+    if chunk == b'VP8 ':
+        return int.from_bytes(data[26:28], 'little') & 0x3FFF, int.from_bytes(data[28:30], 'little') & 0x3FFF
+    if chunk == b'VP8L':
+        bits = int.from_bytes(data[21:25], 'little')
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b'VP8X':
+        return int.from_bytes(data[24:27], 'little') + 1, int.from_bytes(data[27:30], 'little') + 1
+    return None
+
+
+# Batches larger than this are split across parallel ffmpeg processes
+FRAME_EXTRACTION_CHUNK_SIZE = 8
+FRAME_EXTRACTION_WORKERS = min(4, os.cpu_count() or 1)
+
+# How far back to seek when a timestamp past the last decodable frame yields nothing
+END_OF_STREAM_RETRY_SECONDS = 0.5
+
+# Encoders for extracted frames, selected with settings.frame_image_format
+FRAME_ENCODINGS = {
+    'jpeg': {
+        'extension': 'jpg',
+        'mime_type': 'image/jpeg',
+        'output_options': {'format': 'mjpeg', 'pix_fmt': 'yuvj420p', 'q': 3},
+        'read_dimensions': read_jpeg_dimensions,
+    },
+    'webp': {
+        'extension': 'webp',
+        'mime_type': 'image/webp',
+        'output_options': {'format': 'webp', 'c:v': 'libwebp', 'quality': 90},
+        'read_dimensions': read_webp_dimensions,
+    },
+}
+
 
 class FrameService:
     """Service class for frame extraction and management operations"""
 
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, cache: Optional[RedisCache] = None):
         self.db = db
+        self.cache = cache
         self.media_service = MediaService(db)
         self.file_storage = FileStorageService()
 
@@ -39,163 +113,317 @@ class FrameService:
         return self.media_service.check_study_ownership(study_id, doctor_id)
 
     def get_video_metadata(self, video_media_id: UUID) -> Optional[VideoMetadata]:
-        """Get video metadata using ffprobe"""
+        """Get video metadata, probing with ffprobe only if it isn't stored on the media row yet"""
         try:
             video_media = self.db.query(Media).filter(Media.id == video_media_id).first()
             if not video_media or video_media.media_type.value != MediaType.VIDEO.value:
                 return None
-            try:
-                file_data, _ = self.file_storage.read_file(str(video_media.file_path))
-            except Exception:
+            cached_metadata = self.media_service.get_cached_video_metadata(video_media)
+            if cached_metadata:
+                return cached_metadata
+            video_path = self.file_storage.get_local_path(str(video_media.file_path))
+            if not video_path:
                 return None
-            with tempfile.NamedTemporaryFile(suffix='.mp4', delete=False) as temp_file:
-                temp_file.write(file_data)
-                temp_file_path = temp_file.name
-            try:
-                metadata = ffmpeg.probe(temp_file_path)
-                video_stream = None
-                for stream in metadata.get('streams', []):
-                    if stream.get('codec_type') == 'video':
-                        video_stream = stream
-                        break
-                if not video_stream:
-                    return None
-                duration = float(metadata.get('format', {}).get('duration', 0))
-                width = int(video_stream.get('width', 0))
-                height = int(video_stream.get('height', 0))
-                fps = eval(video_stream.get('r_frame_rate', '0/1'))
-                total_frames = int(duration * fps) if fps > 0 else 0
-                return VideoMetadata(
-                    duration_seconds=duration,
-                    width=width,
-                    height=height,
-                    fps=fps,
-                    total_frames=total_frames
-                )
-            finally:
-                os.unlink(temp_file_path)
+            # ffprobe reads the stored file in place (only the container header)
+            metadata = self.media_service.probe_video_file(video_path)
+            if metadata:
+                self.media_service.store_video_metadata(video_media, metadata)
+                self.db.commit()
+            return metadata
         except Exception as e:
             logger.error(f"Error getting video metadata for {video_media_id}: {e}")
+            self.db.rollback()
             return None
 
-    def extract_frame_at_timestamp(
+    async def extract_frame_at_timestamp(
         self, 
         video_media_id: UUID, 
         timestamp_seconds: float,
         doctor_id: UUID,
         study_id: UUID
     ) -> tuple[Optional[Frame], str]:
-        """Extract a frame from video at specified timestamp"""
+        """Extract a frame from video at specified timestamp, off the event loop"""
+        results = await run_ffmpeg_job(
+            self.extract_frames_at_timestamps,
+            video_media_id, [timestamp_seconds], doctor_id, study_id
+        )
+        return results[0]
+
+    def extract_frames_at_timestamps(
+        self,
+        video_media_id: UUID,
+        timestamps: list[float],
+        doctor_id: UUID,
+        study_id: UUID
+    ) -> list[tuple[Optional[Frame], str]]:
+        """Extract frames from video at several timestamps with a single ffmpeg process"""
+        results: list[Optional[tuple[Optional[Frame], str]]] = [None] * len(timestamps)
+
+        def fill_pending(message: str) -> list[tuple[Optional[Frame], str]]:
+            return [result or (None, message) for result in results]
+
         try:
-            self.check_study_ownership(study_id, doctor_id)
-            video_media = self.db.query(Media).filter(Media.id == video_media_id).first()
+            # One query loads the video, checks ownership and fetches any frames
+            # already stored at the requested timestamps (one row per match)
+            rows = self.db.query(Media, Frame).join(
+                Study, Study.id == Media.study_id
+            ).outerjoin(
+                Frame, and_(Frame.video_media_id == Media.id, Frame.timestamp_seconds.in_(timestamps))
+            ).filter(
+                Media.id == video_media_id,
+                Media.study_id == study_id,
+                Study.doctor_id == doctor_id,
+                Study.is_active
+            ).all()
+            video_media = rows[0][0] if rows else None
             if not video_media or video_media.media_type.value != MediaType.VIDEO.value:
                 logger.error(f"Video media not found: {video_media_id}")
-                return None, "Video not found or invalid format"
-            existing_frame = self.db.query(Frame).filter(
-                Frame.video_media_id == video_media_id,
-                Frame.timestamp_seconds == timestamp_seconds
-            ).first()
-            if existing_frame:
+                return fill_pending("Video not found or invalid format")
+            # An active frame wins over soft-deleted ones at the same timestamp: reactivating
+            # one of those next to it would violate ux_frames_video_timestamp_active
+            existing_frames: dict[float, Frame] = {}
+            for _, frame in rows:
+                if frame is not None and (frame.timestamp_seconds not in existing_frames or frame.is_active):
+                    existing_frames[frame.timestamp_seconds] = frame
+            pending: list[tuple[int, float]] = []
+            for index, timestamp_seconds in enumerate(timestamps):
+                existing_frame = existing_frames.get(timestamp_seconds)
+                if not existing_frame:
+                    pending.append((index, timestamp_seconds))
+                    continue
                 is_active = cast(bool, existing_frame.is_active)
                 if is_active:
                     logger.info(f"Active frame already exists at timestamp {timestamp_seconds} for video {video_media_id}")
-                    return existing_frame, "Frame already exists at this timestamp"
+                    results[index] = (existing_frame, "Frame already exists at this timestamp")
                 else:
                     logger.info(f"Reactivating soft-deleted frame at timestamp {timestamp_seconds} for video {video_media_id}")
+                    existing_frame_id = existing_frame.id
                     reactivated_frame = self._reactivate_frame(existing_frame)
-                    return reactivated_frame, "Frame reactivated (previous annotations cleared)"
-            try:
-                file_data, _ = self.file_storage.read_file(str(video_media.file_path))
-            except Exception:
+                    if reactivated_frame.id != existing_frame_id:
+                        results[index] = (reactivated_frame, "Frame already exists at this timestamp")
+                    else:
+                        # The frame's image counts towards storage again
+                        MediaService.invalidate_storage_cache(doctor_id, self.cache)
+                        results[index] = (reactivated_frame, "Frame reactivated (previous annotations cleared)")
+            if not pending:
+                return fill_pending("Failed to extract frame from video")
+            # ffmpeg reads the stored video in place instead of a temp copy
+            video_path = self.file_storage.get_local_path(str(video_media.file_path))
+            if not video_path:
                 logger.error(f"Video file not found in storage: {video_media.file_path}")
-                return None, "Video file not accessible"
-            with tempfile.NamedTemporaryFile(suffix='.mp4', delete=False) as video_temp:
-                video_temp.write(file_data)
-                video_temp_path = video_temp.name
-            frame_temp_path = tempfile.mktemp(suffix='.jpg')
-            try:
-                probe = ffmpeg.probe(video_temp_path)
-                duration = float(probe['format']['duration'])
-                if timestamp_seconds >= duration - 0.1:
-                    logger.warning(f"Timestamp {timestamp_seconds}s too close to video end ({duration}s), adjusting")
-                    timestamp_seconds = max(0, duration - 0.2)
-            except Exception as e:
-                logger.warning(f"Could not get video duration: {e}, proceeding with original timestamp")
-            try:
-                stream = ffmpeg.input(video_temp_path, ss=timestamp_seconds)
-                stream = ffmpeg.output(
-                    stream, 
-                    frame_temp_path, 
-                    vframes=1,
-                    format='mjpeg',
-                    pix_fmt='yuvj420p',
-                    q=3,
-                    loglevel='error'
+                return fill_pending("Video file not accessible")
+            video_metadata = self.media_service.get_cached_video_metadata(video_media)
+            if video_metadata is None:
+                video_metadata = self.media_service.probe_video_file(video_path)
+                if video_metadata:
+                    self.media_service.store_video_metadata(video_media, video_metadata)
+            if video_metadata:
+                duration = video_metadata.duration_seconds
+                for position, (index, timestamp_seconds) in enumerate(pending):
+                    if timestamp_seconds >= duration - 0.1:
+                        logger.warning(f"Timestamp {timestamp_seconds}s too close to video end ({duration}s), adjusting")
+                        pending[position] = (index, max(0, duration - 0.2))
+            else:
+                logger.warning("Could not get video duration, proceeding with original timestamp")
+            frame_encoding = FRAME_ENCODINGS[settings.frame_image_format]
+            extracted: list[tuple[int, float, bytes]] = []
+            frames = self._run_frame_extraction(video_path, [timestamp for _, timestamp in pending])
+            # A seek at or past the last decodable frame yields nothing; instead of pre-checking
+            # with ffprobe, retry those timestamps once a little earlier
+            retry_positions = [
+                position for position, frame_data in enumerate(frames)
+                if not frame_data and pending[position][1] > 0
+            ]
+            if retry_positions:
+                for position in retry_positions:
+                    index, timestamp_seconds = pending[position]
+                    pending[position] = (index, max(0.0, timestamp_seconds - END_OF_STREAM_RETRY_SECONDS))
+                    logger.warning(f"No frame at {timestamp_seconds}s for video {video_media_id}, retrying at {pending[position][1]}s")
+                retried = self._run_frame_extraction(video_path, [pending[position][1] for position in retry_positions])
+                for position, frame_data in zip(retry_positions, retried):
+                    frames[position] = frame_data
+            for (index, timestamp_seconds), frame_data in zip(pending, frames):
+                if not frame_data:
+                    logger.error(f"FFmpeg produced no frame for video {video_media_id} at {timestamp_seconds}s")
+                    results[index] = (None, "Failed to extract frame from video")
+                    continue
+                extracted.append((index, timestamp_seconds, frame_data))
+            logger.info(f"FFmpeg extraction successful for video {video_media_id}: {len(extracted)} frame(s)")
+            frame_count = self.get_last_frame_number(video_media_id)
+            new_media: list[Media] = []
+            new_frames: list[tuple[int, dict, Media]] = []
+            for index, timestamp_seconds, frame_data in extracted:
+                dimensions = frame_encoding['read_dimensions'](frame_data)
+                if dimensions is None:
+                    logger.error(f"Could not read frame size for video {video_media_id} at {timestamp_seconds}s")
+                    results[index] = (None, "Failed to extract frame from video")
+                    continue
+                width, height = dimensions
+                frame_filename = (
+                    f"frame_{video_media_id}_{timestamp_seconds:.3f}s_{uuid.uuid4().hex[:8]}.{frame_encoding['extension']}"
                 )
-                ffmpeg.run(stream, capture_stderr=True, overwrite_output=True)
-                logger.info(f"FFmpeg extraction successful for video {video_media_id} at {timestamp_seconds}s")
-                with open(frame_temp_path, 'rb') as frame_file:
-                    frame_data = frame_file.read()
-                with PILImage.open(frame_temp_path) as img:
-                    width, height = img.size
-                frame_filename = f"frame_{video_media_id}_{timestamp_seconds:.3f}s_{uuid.uuid4().hex[:8]}.jpg"
                 frame_file_info = self.file_storage.create_file(frame_data, frame_filename)
                 frame_file_path = frame_file_info.file_id
-                frame_media_data = {
-                    'study_id': video_media.study_id,
-                    'filename': frame_filename,
-                    'file_path': frame_file_path,
-                    'file_size': len(frame_data),
-                    'mime_type': 'image/jpeg',
-                    'media_type': MediaType.FRAME,
-                    'upload_status': UploadStatus.UPLOADED
-                }
-                frame_media = Media(**frame_media_data)
-                self.db.add(frame_media)
-                self.db.flush()  # Get the media ID
-                frame_count = self.db.query(Frame).filter(
-                    Frame.video_media_id == video_media_id,
-                    Frame.is_active
-                ).count()
-                frame_number = frame_count + 1
-                media_id = cast(UUID, frame_media.id)
-                frame_data = FrameCreate(
+                # Client-side ids let the Frame rows reference their media before it is flushed
+                media_id = uuid.uuid4()
+                frame_media = Media(
+                    id=media_id,
+                    study_id=video_media.study_id,
+                    filename=frame_filename,
+                    file_path=frame_file_path,
+                    file_size=len(frame_data),
+                    mime_type=frame_encoding['mime_type'],
+                    media_type=MediaType.FRAME,
+                    upload_status=UploadStatus.UPLOADED
+                )
+                frame_count += 1
+                frame_create = FrameCreate(
                     video_media_id=video_media_id,
                     frame_media_id=media_id,
                     timestamp_seconds=timestamp_seconds,
-                    frame_number=frame_number,
+                    frame_number=frame_count,
                     width=width,
                     height=height
                 )
-                frame = Frame(**frame_data.model_dump())
-                self.db.add(frame)
-                self.db.commit()
-                logger.info(f"Successfully extracted frame {frame.id} from video {video_media_id} at {timestamp_seconds}s")
-                return frame, "Frame extracted successfully"
-            finally:
-                if os.path.exists(video_temp_path):
-                    os.unlink(video_temp_path)
-                if os.path.exists(frame_temp_path):
-                    os.unlink(frame_temp_path)
+                new_media.append(frame_media)
+                new_frames.append((index, frame_create.model_dump(), frame_media))
+            if not new_frames:
+                return fill_pending("Failed to extract frame from video")
+            self.db.add_all(new_media)
+            self.db.flush()
+            # A concurrent request may have stored the same timestamp while we were extracting;
+            # the partial unique index turns that race into a skipped row instead of a duplicate
+            inserted_frames = {
+                frame.frame_media_id: frame
+                for frame in self.db.scalars(
+                    pg_insert(Frame).values([frame_values for _, frame_values, _ in new_frames]).on_conflict_do_nothing(
+                        index_elements=[Frame.video_media_id, Frame.timestamp_seconds],
+                        index_where=Frame.is_active
+                    ).returning(Frame)
+                )
+            }
+            lost_frames = [entry for entry in new_frames if entry[2].id not in inserted_frames]
+            inserted_bytes = sum(
+                cast(int, frame_media.file_size) for _, _, frame_media in new_frames
+                if frame_media.id in inserted_frames
+            )
+            existing_frames = {}
+            orphaned_files: list[str] = []
+            if lost_frames:
+                for _, _, frame_media in lost_frames:
+                    orphaned_files.append(str(frame_media.file_path))
+                    self.db.delete(frame_media)
+                existing_frames = {
+                    frame.timestamp_seconds: frame
+                    for frame in self.db.query(Frame).filter(
+                        Frame.video_media_id == video_media_id,
+                        Frame.timestamp_seconds.in_([frame_values['timestamp_seconds'] for _, frame_values, _ in lost_frames]),
+                        Frame.is_active
+                    ).all()
+                }
+            self.db.commit()
+            MediaService.adjust_storage_cache(doctor_id, inserted_bytes, self.cache)
+            # Lost the race: drop our copy and hand back the frame that won
+            for file_path in orphaned_files:
+                self.file_storage.delete_file(file_path)
+            for index, frame_values, _ in new_frames:
+                timestamp_seconds = frame_values['timestamp_seconds']
+                frame = inserted_frames.get(frame_values['frame_media_id'])
+                if frame is not None:
+                    logger.info(f"Successfully extracted frame {frame.id} from video {video_media_id} at {timestamp_seconds}s")
+                    results[index] = (frame, "Frame extracted successfully")
+                    continue
+                logger.info(f"Frame at timestamp {timestamp_seconds} for video {video_media_id} already stored")
+                results[index] = (existing_frames.get(timestamp_seconds), "Frame already exists at this timestamp")
+            return fill_pending("Failed to extract frame from video")
         except ffmpeg.Error as e:
             logger.error(f"FFmpeg error extracting frame: {str(e)}")
             self.db.rollback()
-            return None, "Failed to extract frame from video"
+            return fill_pending("Failed to extract frame from video")
         except Exception as e:
             logger.error(f"Error extracting frame from video {video_media_id}: {e}")
             self.db.rollback()
-            return None, "An error occurred while extracting frame"
+            return fill_pending("An error occurred while extracting frame")
+
+    def _run_frame_extraction(self, video_path: str, timestamps: list[float]) -> list[Optional[bytes]]:
+        """Extract an image per timestamp (None where nothing was produced), in input order"""
+        if len(timestamps) <= FRAME_EXTRACTION_CHUNK_SIZE:
+            return self._run_ffmpeg_extraction(video_path, timestamps)
+        # One ffmpeg process drives all its inputs from a single loop, so large
+        # batches are split into chunks that decode and encode on separate cores
+        chunks = [
+            timestamps[start:start + FRAME_EXTRACTION_CHUNK_SIZE]
+            for start in range(0, len(timestamps), FRAME_EXTRACTION_CHUNK_SIZE)
+        ]
+        with ThreadPoolExecutor(max_workers=min(FRAME_EXTRACTION_WORKERS, len(chunks))) as executor:
+            chunk_frames = list(executor.map(partial(self._run_ffmpeg_extraction, video_path), chunks))
+        return [frame_data for frames in chunk_frames for frame_data in frames]
+
+    def _run_ffmpeg_extraction(self, video_path: str, timestamps: list[float]) -> list[Optional[bytes]]:
+        """Run one ffmpeg process that extracts an image per timestamp (None where nothing was produced)"""
+        hwaccel = settings.ffmpeg_hwaccel or None
+        if hwaccel:
+            try:
+                return self._extract_frames(video_path, timestamps, hwaccel)
+            except ffmpeg.Error as e:
+                stderr = e.stderr.decode(errors='replace').strip() if e.stderr else ''
+                logger.warning(f"Hardware-accelerated ({hwaccel}) frame extraction failed, retrying on CPU: {stderr}")
+        return self._extract_frames(video_path, timestamps, None)
+
+    def _extract_frames(
+        self, video_path: str, timestamps: list[float], hwaccel: Optional[str]
+    ) -> list[Optional[bytes]]:
+        """Extract one image per timestamp, decoding the video with the given ffmpeg hwaccel if any"""
+        frame_encoding = FRAME_ENCODINGS[settings.frame_image_format]
+        frame_options = {'vframes': 1, **frame_encoding['output_options']}
+        # Decoded frames are downloaded to system memory for the CPU image encoder
+        input_options = {'hwaccel': hwaccel} if hwaccel else {}
+        if len(timestamps) == 1:
+            # A single frame is read straight from stdout, without touching the disk
+            stream = ffmpeg.output(
+                ffmpeg.input(video_path, ss=timestamps[0], **input_options), 'pipe:', **frame_options
+            )
+            frame_data, _ = stream.global_args('-loglevel', 'error').run(capture_stdout=True, capture_stderr=True)
+            return [frame_data or None]
+        with tempfile.TemporaryDirectory() as frames_dir:
+            # One input per timestamp: each input seeks with -ss before -i and writes a
+            # single frame, so the process/video-open cost is paid once for the batch
+            output_paths = [
+                os.path.join(frames_dir, f"frame_{position:04d}.{frame_encoding['extension']}")
+                for position in range(len(timestamps))
+            ]
+            outputs = [
+                ffmpeg.output(
+                    ffmpeg.input(video_path, ss=timestamp_seconds, **input_options), output_path, **frame_options
+                )
+                for timestamp_seconds, output_path in zip(timestamps, output_paths)
+            ]
+            ffmpeg.merge_outputs(*outputs).global_args('-loglevel', 'error').run(
+                capture_stdout=True, capture_stderr=True, overwrite_output=True
+            )
+            frames: list[Optional[bytes]] = []
+            for output_path in output_paths:
+                if not os.path.exists(output_path):
+                    frames.append(None)
+                    continue
+                with open(output_path, 'rb') as frame_file:
+                    frames.append(frame_file.read() or None)
+            return frames
 
     def list_video_frames(self, video_media_id: UUID, doctor_id: UUID) -> list[Frame]:
         """list all frames for a video"""
         try:
-            video_media = self.db.query(Media).filter(Media.id == video_media_id).first()
-            if not video_media or video_media.media_type.value != MediaType.VIDEO.value:
-                return []
-            frames = self.db.query(Frame).filter(
+            # The video type and ownership checks ride along on the frame query
+            frames = self.db.query(Frame).join(
+                Media, Media.id == Frame.video_media_id
+            ).join(
+                Study, Study.id == Media.study_id
+            ).filter(
                 Frame.video_media_id == video_media_id,
-                Frame.is_active
+                Frame.is_active,
+                Media.media_type == MediaType.VIDEO,
+                Study.doctor_id == doctor_id,
+                Study.is_active
             ).order_by(Frame.timestamp_seconds.asc()).all()
             return frames
         except Exception as e:
@@ -205,20 +433,31 @@ class FrameService:
     def delete_frame(self, frame_id: UUID, doctor_id: UUID) -> bool:
         """Delete a frame and its associated media"""
         try:
-            frame = self.db.query(Frame).filter(Frame.id == frame_id).first()
-            if not frame:
-                return False
-            video_media = self.db.query(Media).filter(Media.id == frame.video_media_id).first()
-            if video_media is None:
-                raise RuntimeError("Associated video media not found")
-            study_id = cast(UUID, video_media.study_id)
-            if not video_media or not self.check_study_ownership(study_id, doctor_id):
+            # Only frames of videos in the doctor's active studies can be deleted
+            owned_video_ids = select(Media.id).join(Study, Study.id == Media.study_id).where(
+                Study.doctor_id == doctor_id,
+                Study.is_active
+            ).correlate(None)
+            # Deactivating the frame returns its media id, which the outer statement
+            # deactivates too: ownership check and both updates in one round trip.
+            # Only active rows match, so a concurrent second delete finds nothing and
+            # the storage total is adjusted once
+            deactivated_frame = update(Frame).where(
+                Frame.id == frame_id,
+                Frame.is_active,
+                Frame.video_media_id.in_(owned_video_ids)
+            ).values(is_active=False).returning(Frame.frame_media_id).cte("deactivated_frame")
+            deleted_size = self.db.execute(
+                update(Media)
+                .where(Media.id.in_(select(deactivated_frame.c.frame_media_id)), Media.is_active)
+                .values(is_active=False)
+                .returning(Media.file_size)
+            ).scalar()
+            if deleted_size is None:
+                self.db.rollback()
                 return False
-            frame_media = self.db.query(Media).filter(Media.id == frame.frame_media_id).first()
-            self.db.query(Frame).filter(Frame.id == frame_id).update({'is_active': False})
-            if frame_media:
-                self.db.query(Media).filter(Media.id == frame.frame_media_id).update({'is_active': False})
             self.db.commit()
+            MediaService.adjust_storage_cache(doctor_id, -deleted_size, self.cache)
             logger.info(f"Successfully deleted frame {frame_id}")
             return True
         except Exception as e:
@@ -229,39 +468,68 @@ class FrameService:
     def get_frame(self, frame_id: UUID, doctor_id: UUID) -> Optional[Frame]:
         """Get a specific frame by ID"""
         try:
-            frame = self.db.query(Frame).filter(
+            # One query loads the frame and checks the doctor owns its video's study
+            return self.db.query(Frame).join(
+                Media, Media.id == Frame.video_media_id
+            ).join(
+                Study, Study.id == Media.study_id
+            ).filter(
                 Frame.id == frame_id,
-                Frame.is_active
+                Frame.is_active,
+                Study.doctor_id == doctor_id,
+                Study.is_active
             ).first()
-            if not frame:
-                return None
-            video_media = self.db.query(Media).filter(Media.id == frame.video_media_id).first()
-            if video_media is None:
-                raise RuntimeError("Associated video media not found")
-            study_id = cast(UUID, video_media.study_id)
-            if not video_media or not self.check_study_ownership(study_id, doctor_id):
-                return None
-            return frame
         except Exception as e:
             logger.error(f"Error getting frame {frame_id}: {e}")
             return None
 
+    def get_last_frame_number(self, video_media_id: UUID) -> int:
+        """
+        Get the highest frame number used for a video, locking the video row
+        until commit so concurrent extractions can't hand out the same number.
+        """
+        self.db.query(Media.id).filter(Media.id == video_media_id).with_for_update().first()
+        return self.db.query(func.coalesce(func.max(Frame.frame_number), 0)).filter(
+            Frame.video_media_id == video_media_id
+        ).scalar()
+
     def _reactivate_frame(self, frame: Frame) -> Frame:
         """Reactivate a soft-deleted frame and clear its annotations"""
+        frame_id = frame.id
+        video_media_id = frame.video_media_id
+        timestamp_seconds = frame.timestamp_seconds
         try:
-            self.db.query(Frame).filter(Frame.id == frame.id).update({'is_active': True})
-            self.db.query(Media).filter(Media.id == frame.frame_media_id).update({'is_active': True})
-            self.db.query(PictureBBAnnotation).filter(
+            # One statement (data-modifying CTEs) instead of four round trips
+            cleared_bb = delete(PictureBBAnnotation).where(
                 PictureBBAnnotation.media_id == frame.frame_media_id
-            ).delete()
-            self.db.query(PictureClassificationAnnotation).filter(
+            ).cte("cleared_bb_annotations")
+            cleared_classification = delete(PictureClassificationAnnotation).where(
                 PictureClassificationAnnotation.media_id == frame.frame_media_id
-            ).delete()
+            ).cte("cleared_classification_annotations")
+            reactivated_frame = update(Frame).where(Frame.id == frame.id).values(is_active=True).cte("reactivated_frame")
+            self.db.execute(
+                update(Media)
+                .where(Media.id == frame.frame_media_id)
+                .values(is_active=True)
+                .add_cte(cleared_bb, cleared_classification, reactivated_frame)
+            )
             self.db.commit()
             self.db.refresh(frame)
             logger.info(f"Successfully reactivated frame {frame.id} and cleared annotations")
             return frame
+        except IntegrityError:
+            # Another frame is already active at this timestamp (ux_frames_video_timestamp_active)
+            self.db.rollback()
+            active_frame = self.db.query(Frame).filter(
+                Frame.video_media_id == video_media_id,
+                Frame.timestamp_seconds == timestamp_seconds,
+                Frame.is_active
+            ).first()
+            if active_frame is None:
+                raise
+            logger.info(f"Frame {frame_id} not reactivated, frame {active_frame.id} is already active at {timestamp_seconds}s")
+            return active_frame
         except Exception as e:
-            logger.error(f"Error reactivating frame {frame.id}: {e}")
+            logger.error(f"Error reactivating frame {frame_id}: {e}")
             self.db.rollback()
             raise e
@@ -5,26 +5,50 @@ Media service for business logic operations.
 
 import logging
 import os
-import tempfile
+import subprocess
 from typing import Optional, cast
-from uuid import UUID
+from uuid import UUID, uuid4
 
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import case, exists, func, select, update
 import ffmpeg
-from PIL import Image as PILImage
 
 from app.models.media import Media, MediaType, UploadStatus
 from app.models.study import Study
 from app.models.frame import Frame
 from app.models.picture_classification_annotation import PictureClassificationAnnotation
 from app.schemas.media import MediaCreate, MediaUpdate
+from app.schemas.frame import VideoMetadata
 from app.core.file_storage import FileStorageService, FileInfo
 from app.core.cache import RedisCache
 
 
 logger = logging.getLogger(__name__)
 
+# ffprobe read limits: container headers (the MP4 moov atom) carry everything we read,
+# so don't let it scan the default 5 MB / 5 s of stream data to refine codec parameters
+FFPROBE_LIMITS = {'probesize': '500000', 'analyzeduration': '100000'}
+
+# Bounding box of video preview thumbnails
+PREVIEW_MAX_SIZE = (320, 240)
+
+# ffmpeg arguments after the input for a preview: scale to fit PREVIEW_MAX_SIZE in the same pass,
+# grab one frame and write it to stdout as JPEG (quality 5 for smaller file size)
+PREVIEW_FFMPEG_OUTPUT_ARGS = (
+    '-vf', (
+        f"scale='min({PREVIEW_MAX_SIZE[0]},iw)':'min({PREVIEW_MAX_SIZE[1]},ih)'"
+        ":force_original_aspect_ratio=decrease:flags=lanczos"
+    ),
+    '-frames:v', '1',
+    '-f', 'mjpeg',
+    '-q:v', '5',
+    'pipe:1',
+)
+
+# Per-doctor storage totals are kept in Redis; every write path adjusts or drops them after commit,
+# and the TTL only backs that up by forcing a fresh SUM periodically
+STORAGE_USED_CACHE_TTL = 300
+
 
 class MediaService:
     """Service class for media operations"""
@@ -35,41 +59,121 @@ class MediaService:
 
     def check_study_ownership(self, study_id: UUID, doctor_id: UUID) -> bool:
         """
-        Check if a study belongs to a doctor.
+        Check if a study belongs to a doctor (memoized for the lifetime of the session).
         Args:
             study_id: ID of the study
             doctor_id: ID of the doctor
         Returns:
             True if study belongs to doctor, False otherwise
         """
-        study = self.db.query(Study).filter(
+        # The session is request-scoped, so every service sharing it reuses the answer;
+        # StudyService.delete_study drops the cache
+        ownership_cache = self.db.info.setdefault("study_ownership_cache", {})
+        cache_key = (study_id, doctor_id)
+        if cache_key not in ownership_cache:
+            ownership_cache[cache_key] = self.db.query(
+                exists().where(
+                    Study.id == study_id,
+                    Study.doctor_id == doctor_id,
+                    Study.is_active
+                )
+            ).scalar()
+        return ownership_cache[cache_key]
+
+    def _ownership_and_usage(self, study_id: UUID, doctor_id: UUID) -> tuple[bool, int]:
+        """
+        Check study ownership and sum the doctor's storage usage in one round-trip.
+        Args:
+            study_id: ID of the study
+            doctor_id: ID of the doctor
+        Returns:
+            Tuple of (study belongs to doctor, total size in bytes of the stored files)
+        """
+        is_owner = exists().where(
             Study.id == study_id,
             Study.doctor_id == doctor_id,
             Study.is_active
-        ).first()
-        return study is not None
+        )
+        used_bytes = (
+            select(func.coalesce(func.sum(Media.file_size), 0))
+            .join(Study)
+            .where(Study.doctor_id == doctor_id, Study.is_active, Media.is_active)
+            .scalar_subquery()
+        )
+        owned, used = self.db.execute(select(is_owner, used_bytes)).one()
+        self.db.info.setdefault("study_ownership_cache", {})[(study_id, doctor_id)] = owned
+        return owned, int(used)
 
-    def get_doctor_file_ids(self, doctor_id: UUID) -> list[str]:
+    def get_doctor_storage_bytes(self, doctor_id: UUID) -> int:
         """
-        Get all file IDs for a doctor's active media.
+        Get the storage used by a doctor's active media, summed in the database.
         Args:
             doctor_id: ID of the doctor
         Returns:
-            list of file IDs
+            Total size in bytes of the stored files
         """
-        media_files = self.db.query(Media.file_path).join(Study).filter(
+        used_bytes = self.db.query(func.coalesce(func.sum(Media.file_size), 0)).join(Study).filter(
             Study.doctor_id == doctor_id,
             Study.is_active,
             Media.is_active
-        ).all()
-        return [media.file_path for media in media_files]
+        ).scalar()
+        return int(used_bytes)
+
+    @staticmethod
+    def _storage_cache_key(doctor_id: UUID) -> str:
+        return f"storage_used:{doctor_id}"
+
+    def _get_cached_storage_bytes(self, doctor_id: UUID, cache: Optional[RedisCache]) -> Optional[int]:
+        """Get the doctor's storage total from Redis, or None on a miss"""
+        if not cache:
+            return None
+        cached_value = cache.get(self._storage_cache_key(doctor_id))
+        return int(cached_value) if cached_value is not None else None
+
+    def _set_cached_storage_bytes(self, doctor_id: UUID, used_bytes: int, cache: Optional[RedisCache]) -> None:
+        """Seed the doctor's storage total in Redis from a database SUM"""
+        if cache:
+            cache.set(self._storage_cache_key(doctor_id), str(used_bytes).encode(), ttl=STORAGE_USED_CACHE_TTL)
+
+    @staticmethod
+    def adjust_storage_cache(doctor_id: UUID, delta: int, cache: Optional[RedisCache] = None) -> None:
+        """
+        Apply a committed change in stored bytes to the doctor's cached storage total, if one is cached.
+        
+        Args:
+            doctor_id: ID of the doctor owning the media
+            delta: Bytes added (positive) or removed (negative)
+            cache: Optional RedisCache instance
+        """
+        if cache and delta:
+            cache.incrby_if_exists(MediaService._storage_cache_key(doctor_id), delta)
+
+    @staticmethod
+    def invalidate_storage_cache(doctor_id: UUID, cache: Optional[RedisCache] = None) -> None:
+        """
+        Drop the doctor's cached storage total so the next check sums it in the database.
+        Used where the size of the change isn't known (study deletion, frame reactivation).
+        
+        Args:
+            doctor_id: ID of the doctor
+            cache: Optional RedisCache instance
+        """
+        if cache:
+            cache.delete(MediaService._storage_cache_key(doctor_id))
+
+    @staticmethod
+    def invalidate_all_storage_caches(cache: Optional[RedisCache] = None) -> None:
+        """Drop every doctor's cached storage total (after bulk deletes across doctors)"""
+        if cache:
+            cache.delete_matching("storage_used:*")
 
     def create_media(
         self,
         study_id: UUID,
         doctor_id: UUID,
         file_data: bytes,
-        filename: str
+        filename: str,
+        cache: Optional[RedisCache] = None
     ) -> Media:
         """
         Create a new media file for a study.
@@ -78,52 +182,129 @@ class MediaService:
             doctor_id: ID of the doctor
             file_data: Raw file bytes
             filename: Original filename
+            cache: Optional RedisCache instance holding the doctor's storage total
         Returns:
             Created media object
         Raises:
             ValueError: If study doesn't belong to doctor or storage issues
             OSError: If file cannot be stored
         """
-        if not self.check_study_ownership(study_id, doctor_id):
+        used_bytes = self._get_cached_storage_bytes(doctor_id, cache)
+        if used_bytes is not None:
+            owned = self.check_study_ownership(study_id, doctor_id)
+        else:
+            owned, used_bytes = self._ownership_and_usage(study_id, doctor_id)
+            self._set_cached_storage_bytes(doctor_id, used_bytes, cache)
+        if not owned:
             raise ValueError("Study not found or access denied")
-        doctor_file_ids = self.get_doctor_file_ids(doctor_id)
-        if not self.file_storage.check_storage_availability(doctor_file_ids, len(file_data)):
-            storage_info = self.file_storage.get_storage_info(doctor_file_ids)
+        if not self.file_storage.has_storage_available(used_bytes, len(file_data)):
+            storage_info = self.file_storage.build_storage_info(used_bytes)
             raise ValueError(
                 f"Storage limit exceeded. Used: {storage_info['used_mb']:.1f}MB/"
                 f"{storage_info['total_mb']:.1f}MB"
             )
         file_info: FileInfo = self.file_storage.create_file(file_data, filename)
-        logger.debug("🔍 Step 1 - file_info.media_type: %s (type: %s)", file_info.media_type, type(file_info.media_type))
-        media_type_enum = MediaType(file_info.media_type)
-        logger.debug("🔍 Step 2 - MediaType enum: %s (type: %s)", media_type_enum, type(media_type_enum))
+        media_type = MediaType(file_info.media_type)
+        # Validates the stored file's attributes (e.g. filename length) before they reach the row;
+        # the row itself is built from the enum, since the schema dumps enum values as strings
         media_data = MediaCreate(
             study_id=study_id,
             filename=file_info.filename,
             file_path=file_info.file_id,
             file_size=file_info.file_size,
             mime_type=file_info.mime_type,
-            media_type=media_type_enum
+            media_type=media_type
         )
-        logger.debug("🔍 Step 3 - media_data.media_type: %s (type: %s)", media_data.media_type, type(media_data.media_type))
-        model_dump_result = media_data.model_dump(mode='python')
-        logger.debug("🔍 Step 4 - model_dump result: %s", model_dump_result)
         db_media = Media(
-            study_id=model_dump_result['study_id'],
-            filename=model_dump_result['filename'],
-            file_path=model_dump_result['file_path'],
-            file_size=model_dump_result['file_size'],
-            mime_type=model_dump_result['mime_type'],
-            media_type=media_type_enum,
+            study_id=media_data.study_id,
+            filename=media_data.filename,
+            file_path=media_data.file_path,
+            file_size=media_data.file_size,
+            mime_type=media_data.mime_type,
+            media_type=media_type,
             upload_status=UploadStatus.UPLOADED
         )
-        logger.debug("🔍 Step 5 - db_media.media_type: %s (type: %s)", db_media.media_type, type(db_media.media_type))
+        if media_type == MediaType.VIDEO:
+            # Probe once here so frame extraction can read metadata from the row
+            video_path = self.file_storage.get_local_path(file_info.file_id)
+            video_metadata = self.probe_video_file(video_path) if video_path else None
+            if video_metadata:
+                self.store_video_metadata(db_media, video_metadata)
         self.db.add(db_media)
         self.db.commit()
         self.db.refresh(db_media)
+        self.adjust_storage_cache(doctor_id, file_info.file_size, cache)
         logger.info("Created media %s for study %s", db_media.id, study_id)
         return db_media
 
+    def probe_video_file(self, video_path: str) -> Optional[VideoMetadata]:
+        """
+        Probe a video file with ffprobe.
+        Args:
+            video_path: Path of the video on disk
+        Returns:
+            Video metadata, or None if the file has no video stream or cannot be probed
+        """
+        try:
+            metadata = ffmpeg.probe(video_path, v='error', **FFPROBE_LIMITS)
+        except ffmpeg.Error as e:
+            logger.warning("ffprobe failed for %s: %s", video_path, e)
+            return None
+        video_stream = None
+        for stream in metadata.get('streams', []):
+            if stream.get('codec_type') == 'video':
+                video_stream = stream
+                break
+        if not video_stream:
+            return None
+        duration = float(metadata.get('format', {}).get('duration', 0))
+        width = int(video_stream.get('width', 0))
+        height = int(video_stream.get('height', 0))
+        # r_frame_rate is a "num/den" fraction; parse it rather than eval() ffprobe output
+        numerator, _, denominator = video_stream.get('r_frame_rate', '0/1').partition('/')
+        fps = int(numerator) / int(denominator) if denominator and int(denominator) else 0.0
+        total_frames = int(duration * fps) if fps > 0 else 0
+        return VideoMetadata(
+            duration_seconds=duration,
+            width=width,
+            height=height,
+            fps=fps,
+            total_frames=total_frames
+        )
+
+    @staticmethod
+    def get_cached_video_metadata(media: Media) -> Optional[VideoMetadata]:
+        """
+        Get the video metadata stored on a media row.
+        Args:
+            media: Video media object
+        Returns:
+            Video metadata, or None if it has not been probed yet
+        """
+        if media.duration_seconds is None or media.fps is None:
+            return None
+        return VideoMetadata(
+            duration_seconds=cast(float, media.duration_seconds),
+            width=cast(int, media.width),
+            height=cast(int, media.height),
+            fps=cast(float, media.fps),
+            total_frames=cast(int, media.total_frames)
+        )
+
+    @staticmethod
+    def store_video_metadata(media: Media, metadata: VideoMetadata) -> None:
+        """
+        Copy probed video metadata onto a media row (the caller commits).
+        Args:
+            media: Video media object
+            metadata: Probed video metadata
+        """
+        media.duration_seconds = metadata.duration_seconds  # type: ignore
+        media.width = metadata.width  # type: ignore
+        media.height = metadata.height  # type: ignore
+        media.fps = metadata.fps  # type: ignore
+        media.total_frames = metadata.total_frames  # type: ignore
+
     def get_media_by_id(self, media_id: UUID, doctor_id: UUID) -> Optional[Media]:
         """
         Get a media by ID, ensuring it belongs to the doctor.
@@ -172,31 +353,53 @@ class MediaService:
         Returns:
             Updated media if found and belongs to doctor, None otherwise
         """
-        db_media = self.get_media_by_id(media_id, doctor_id)
+        update_data = media_data.model_dump(exclude_unset=True)
+        if not update_data:
+            return self.get_media_by_id(media_id, doctor_id)
+        # One UPDATE ... RETURNING checks ownership, applies the change and reloads the row
+        owned_study_ids = select(Study.id).where(
+            Study.doctor_id == doctor_id,
+            Study.is_active
+        )
+        db_media = self.db.scalars(
+            update(Media).where(
+                Media.id == media_id,
+                Media.study_id.in_(owned_study_ids),
+                Media.is_active
+            ).values(**update_data).returning(Media)
+        ).first()
         if not db_media:
+            self.db.rollback()
             return None
-        update_data = media_data.model_dump(exclude_unset=True)
-        for field, value in update_data.items():
-            setattr(db_media, field, value)
         self.db.commit()
-        self.db.refresh(db_media)
         logger.info("Updated media %s", media_id)
         return db_media
 
-    def delete_media(self, media_id: UUID, doctor_id: UUID) -> bool:
+    def delete_media(self, media_id: UUID, doctor_id: UUID, cache: Optional[RedisCache] = None) -> bool:
         """
         Soft delete a media record.
         Args:
             media_id: ID of the media
             doctor_id: ID of the doctor
+            cache: Optional RedisCache instance holding the doctor's storage total
         Returns:
             True if media was deleted, False if not found
         """
-        db_media = self.get_media_by_id(media_id, doctor_id)
-        if not db_media:
+        # UPDATE ... FROM studies: the ownership check and the update are one statement
+        deleted_size = self.db.execute(
+            update(Media).where(
+                Media.id == media_id,
+                Media.study_id == Study.id,
+                Study.doctor_id == doctor_id,
+                Study.is_active,
+                Media.is_active
+            ).values(is_active=False).returning(Media.file_size)
+        ).scalar()
+        if deleted_size is None:
+            self.db.rollback()
             return False
-        self.db.query(Media).filter(Media.id == media_id).update({"is_active": False})
         self.db.commit()
+        self.adjust_storage_cache(doctor_id, -deleted_size, cache)
         logger.info("Soft deleted media %s", media_id)
         return True
 
@@ -219,7 +422,9 @@ class MediaService:
             logger.error("Failed to read file %s: %s", db_media.file_path, e)
             return None
 
-    def get_media_file_chunked(self, media_id: UUID, doctor_id: UUID, chunk_size: int = 8192):
+    def get_media_file_chunked(
+        self, media_id: UUID, doctor_id: UUID, chunk_size: int = FileStorageService.STREAM_CHUNK_SIZE
+    ):
         """
         Get media file data as chunks for streaming.
         Args:
@@ -240,6 +445,24 @@ class MediaService:
             logger.error("Failed to read file chunks %s: %s", db_media.file_path, e)
             return None
 
+    def get_media_file_path(self, media_id: UUID, doctor_id: UUID) -> Optional[tuple[str, str, str]]:
+        """
+        Get the on-disk location of a media file so it can be served without buffering it.
+        Args:
+            media_id: ID of the media
+            doctor_id: ID of the doctor
+        Returns:
+            tuple of (file_path, mime_type, filename) if found, None otherwise
+        """
+        db_media = self.get_media_by_id(media_id, doctor_id)
+        if not db_media:
+            return None
+        file_path = self.file_storage.get_local_path(str(db_media.file_path))
+        if not file_path:
+            logger.error("Media file %s not found on disk", db_media.file_path)
+            return None
+        return file_path, cast(str, db_media.mime_type), str(db_media.filename)
+
     def get_media_file_range(self, media_id: UUID, doctor_id: UUID, start: int, end: int) -> Optional[tuple[bytes, str, str, int]]:
         """
         Get a specific range of bytes from a media file.
@@ -276,16 +499,20 @@ class MediaService:
             return None
         return cast(str, db_media.mime_type), str(db_media.filename), cast(int, db_media.file_size)
 
-    def get_storage_info(self, doctor_id: UUID) -> dict:
+    def get_storage_info(self, doctor_id: UUID, cache: Optional[RedisCache] = None) -> dict:
         """
         Get storage usage information for a doctor.
         Args:
             doctor_id: ID of the doctor
+            cache: Optional RedisCache instance holding the doctor's storage total
         Returns:
             Dictionary with storage information
         """
-        doctor_file_ids = self.get_doctor_file_ids(doctor_id)
-        return self.file_storage.get_storage_info(doctor_file_ids)
+        used_bytes = self._get_cached_storage_bytes(doctor_id, cache)
+        if used_bytes is None:
+            used_bytes = self.get_doctor_storage_bytes(doctor_id)
+            self._set_cached_storage_bytes(doctor_id, used_bytes, cache)
+        return self.file_storage.build_storage_info(used_bytes)
 
     def count_media_by_study(self, study_id: UUID, doctor_id: UUID) -> int:
         """
@@ -299,28 +526,25 @@ class MediaService:
         if not self.check_study_ownership(study_id, doctor_id):
             return 0
         # pylint: disable=not-callable
-        return self.db.query(func.count(Media.id)).filter(
+        # COUNT(*) rather than COUNT(id): only indexed columns are referenced, so Postgres can
+        # answer from the ix_media_study_active_type partial index without visiting the heap
+        return self.db.query(func.count()).select_from(Media).filter(
             Media.study_id == study_id,
+            Media.is_active,
             Media.media_type.in_([MediaType.IMAGE, MediaType.VIDEO])  # Exclude frames
         ).scalar()
 
-    def get_video_preview_frame(
-        self, 
-        media_id: UUID, 
-        doctor_id: UUID,
-        cache: Optional[RedisCache] = None
-    ) -> Optional[bytes]:
+    def ensure_preview_frame(self, media_id: UUID, doctor_id: UUID) -> Optional[str]:
         """
-        Get a preview frame for a video at 0.5s timestamp.
-        Uses Redis + filesystem caching for performance.
+        Get the on-disk preview frame for a video at 0.5s timestamp, extracting it on first use.
+        The file is served as-is by the endpoint, so cache hits never load it into Python.
         
         Args:
             media_id: ID of the video media
             doctor_id: ID of the doctor (for access control)
-            cache: Optional RedisCache instance for caching
         
         Returns:
-            JPEG bytes of the preview frame, or None if extraction fails
+            Path to the JPEG preview frame, or None if extraction fails
         """
         # Check ownership and verify it's a video
         db_media = self.get_media_by_id(media_id, doctor_id)
@@ -328,119 +552,79 @@ class MediaService:
             logger.warning("Media %s not found or not a video", media_id)
             return None
         
-        # Cache key for Redis
-        redis_cache_key = f"video_preview:{media_id}"
-        
         # Filesystem cache path
         preview_cache_dir = "media_storage/previews"
         os.makedirs(preview_cache_dir, exist_ok=True)
         preview_cache_path = os.path.join(preview_cache_dir, f"{media_id}.jpg")
         
-        # 1. Try Redis cache first (fastest)
-        if cache:
-            try:
-                cached_data = cache.get(redis_cache_key)
-                if cached_data:
-                    logger.debug("✅ Preview frame cache hit (Redis): %s", media_id)
-                    return cached_data
-            except Exception as e:
-                logger.warning("Redis cache lookup failed: %s", e)
-        
-        # 2. Try filesystem cache (fallback)
+        # 1. Serve the cached preview if it was already extracted
         if os.path.exists(preview_cache_path):
-            try:
-                with open(preview_cache_path, 'rb') as f:
-                    preview_data = f.read()
-                logger.debug("✅ Preview frame cache hit (filesystem): %s", media_id)
-                
-                # Update Redis cache if available
-                if cache:
-                    try:
-                        cache.set(redis_cache_key, preview_data, ttl=86400)  # 24 hours
-                    except Exception as e:
-                        logger.warning("Failed to update Redis cache: %s", e)
-                
-                return preview_data
-            except Exception as e:
-                logger.warning("Failed to read cached preview: %s", e)
+            logger.debug("✅ Preview frame cache hit (filesystem): %s", media_id)
+            return preview_cache_path
         
-        # 3. Extract new preview frame
+        # 2. Extract new preview frame
         try:
             logger.debug("🎬 Extracting preview frame for video %s", media_id)
             
-            # Get video file data
-            file_data, _ = self.file_storage.read_file(str(db_media.file_path))
+            # ffmpeg reads the stored video in place instead of a temp copy
+            video_path = self.file_storage.get_local_path(str(db_media.file_path))
+            if not video_path:
+                logger.warning("Video file not found in storage: %s", db_media.file_path)
+                return None
             
-            # Create temporary files for processing
-            with tempfile.NamedTemporaryFile(suffix='.mp4', delete=False) as video_temp:
-                video_temp.write(file_data)
-                video_temp_path = video_temp.name
+            # Use 0.5s if video is long enough, otherwise use 10% of duration. Without cached
+            # metadata, seek to 0.5s blind and fall back to the first frame instead of probing
+            video_metadata = self.get_cached_video_metadata(db_media)
+            if video_metadata is not None:
+                duration = video_metadata.duration_seconds
+                timestamps = [0.5 if duration > 0.5 else max(0.1, duration * 0.1)]
+                logger.debug("Video duration: %.2fs, extracting at %.2fs", duration, timestamps[0])
+            else:
+                timestamps = [0.5, 0.0]
             
-            frame_temp_path = tempfile.mktemp(suffix='.jpg')
+            preview_data = b''
+            for timestamp in timestamps:
+                preview_data = self._extract_preview_jpeg(video_path, timestamp)
+                if preview_data:
+                    break
+            if not preview_data:
+                logger.warning("No frame found for preview of video %s", media_id)
+                return None
             
-            try:
-                # Get video duration to ensure 0.5s is valid
-                probe = ffmpeg.probe(video_temp_path)
-                duration = float(probe['format']['duration'])
-                
-                # Use 0.5s if video is long enough, otherwise use 10% of duration
-                timestamp = 0.5 if duration > 0.5 else max(0.1, duration * 0.1)
-                
-                logger.debug("Video duration: %.2fs, extracting at %.2fs", duration, timestamp)
-                
-                # Extract frame using ffmpeg
-                stream = ffmpeg.input(video_temp_path, ss=timestamp)
-                stream = ffmpeg.output(
-                    stream,
-                    frame_temp_path,
-                    vframes=1,
-                    format='mjpeg',
-                    **{'q:v': '5'}  # Quality 5 for smaller file size
-                )
-                ffmpeg.run(stream, capture_stderr=True, overwrite_output=True, quiet=True)
-                
-                # Resize to thumbnail size (320x240 max) to reduce file size
-                with PILImage.open(frame_temp_path) as img:
-                    # Calculate dimensions maintaining aspect ratio
-                    img.thumbnail((320, 240), PILImage.Resampling.LANCZOS)
-                    
-                    # Save optimized thumbnail
-                    img.save(frame_temp_path, 'JPEG', quality=75, optimize=True)
-                
-                # Read the generated thumbnail
-                with open(frame_temp_path, 'rb') as f:
-                    preview_data = f.read()
-                
-                logger.info("✅ Preview frame extracted: %s (%.1f KB)", 
-                           media_id, len(preview_data) / 1024)
-                
-                # Cache to filesystem
-                try:
-                    with open(preview_cache_path, 'wb') as f:
-                        f.write(preview_data)
-                except Exception as e:
-                    logger.warning("Failed to cache preview to filesystem: %s", e)
-                
-                # Cache to Redis
-                if cache:
-                    try:
-                        cache.set(redis_cache_key, preview_data, ttl=86400)  # 24 hours
-                    except Exception as e:
-                        logger.warning("Failed to cache preview to Redis: %s", e)
-                
-                return preview_data
-                
-            finally:
-                # Cleanup temp files
-                if os.path.exists(video_temp_path):
-                    os.unlink(video_temp_path)
-                if os.path.exists(frame_temp_path):
-                    os.unlink(frame_temp_path)
+            logger.info("✅ Preview frame extracted: %s (%.1f KB)", 
+                       media_id, len(preview_data) / 1024)
+            
+            # Write under a temporary name and rename, so a concurrent request never serves a partial file
+            temp_path = f"{preview_cache_path}.{uuid4().hex}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(preview_data)
+            os.replace(temp_path, preview_cache_path)
+            
+            return preview_cache_path
                     
         except Exception as e:
             logger.error("Failed to extract preview frame for %s: %s", media_id, e)
             return None
 
+    @staticmethod
+    def _extract_preview_jpeg(video_path: str, timestamp: float) -> bytes:
+        """
+        Extract one frame scaled to thumbnail size (320x240 max) in a single ffmpeg pass.
+        Returns the JPEG bytes read straight from stdout; empty when the video ends before timestamp.
+        """
+        result = subprocess.run(
+            [
+                'ffmpeg', '-hide_banner', '-loglevel', 'error',
+                '-ss', str(timestamp), '-i', video_path,
+                *PREVIEW_FFMPEG_OUTPUT_ARGS
+            ],
+            capture_output=True,
+            timeout=60
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed: {result.stderr.decode('utf-8', errors='ignore')}")
+        return result.stdout
+
     def check_has_annotations(
         self, 
         media_id: UUID, 
@@ -462,20 +646,17 @@ class MediaService:
         Returns:
             True if media has annotations, False otherwise
         """
-        # Check ownership
-        db_media = self.get_media_by_id(media_id, doctor_id)
-        if not db_media:
-            logger.warning("Media %s not found for doctor %s", media_id, doctor_id)
-            return False
-        
         # Redis cache key
         cache_key = f"media_has_annotations:{media_id}"
         
-        # Check cache first
+        # Check cache first; a hit still has to pass the ownership check
         if cache:
             try:
                 cached_value = cache.get(cache_key)
                 if cached_value is not None:
+                    if not self._media_is_owned(media_id, doctor_id):
+                        logger.warning("Media %s not found for doctor %s", media_id, doctor_id)
+                        return False
                     # Decode bytes to string and check
                     result = cached_value.decode('utf-8') == '1'
                     logger.debug("✅ Annotation status cache hit: %s = %s", media_id, result)
@@ -483,31 +664,15 @@ class MediaService:
             except Exception as e:
                 logger.warning("Redis cache lookup failed for %s: %s", media_id, e)
         
-        # Compute annotation status
-        has_annotations = False
-        
-        if db_media.media_type.value in [MediaType.IMAGE.value, MediaType.FRAME.value]:
-            # For images and frames, check direct classification annotation
-            annotation = self.db.query(PictureClassificationAnnotation).filter(
-                PictureClassificationAnnotation.media_id == media_id
-            ).first()
-            has_annotations = annotation is not None
-            
-        elif db_media.media_type.value == MediaType.VIDEO.value:
-            # For videos, check if any frame has classification annotations
-            # Query: frames of this video -> their media records -> check for annotations
-            frame_with_annotation = self.db.query(Frame).join(
-                PictureClassificationAnnotation,
-                Frame.frame_media_id == PictureClassificationAnnotation.media_id
-            ).filter(
-                Frame.video_media_id == media_id,
-                Frame.is_active == True  # noqa: E712
-            ).first()
-            
-            has_annotations = frame_with_annotation is not None
+        # Check ownership and compute annotation status in one query
+        status = self._media_with_annotation_status(media_id, doctor_id)
+        if status is None:
+            logger.warning("Media %s not found for doctor %s", media_id, doctor_id)
+            return False
+        media_type, has_annotations = status
         
         logger.debug("🔍 Computed annotation status for %s (%s): %s", 
-                    media_id, db_media.media_type.value, has_annotations)
+                    media_id, media_type.value, has_annotations)
         
         # Cache the result
         if cache:
@@ -520,6 +685,111 @@ class MediaService:
         
         return has_annotations
 
+    def check_has_annotations_bulk(
+        self,
+        media_ids: list[UUID],
+        doctor_id: UUID,
+        cache: Optional[RedisCache] = None
+    ) -> dict[UUID, bool]:
+        """
+        Check annotation status for many media items at once (e.g. a study gallery).
+        Cached answers are reused; the rest are computed in a single query.
+        Args:
+            media_ids: IDs of the media
+            doctor_id: ID of the doctor (for access control)
+            cache: Optional RedisCache instance
+        Returns:
+            Mapping of media ID to annotation status; media not found or not owned are omitted
+        """
+        if not media_ids:
+            return {}
+        
+        statuses: dict[UUID, bool] = {}
+        if cache:
+            cached_values = cache.mget([f"media_has_annotations:{media_id}" for media_id in media_ids])
+            for media_id, cached_value in zip(media_ids, cached_values):
+                if cached_value is not None:
+                    statuses[media_id] = cached_value.decode('utf-8') == '1'
+        
+        # Ownership is verified for cached ids too, in the same query as the misses
+        misses = [media_id for media_id in media_ids if media_id not in statuses]
+        rows = self.db.execute(
+            select(
+                Media.id,
+                case(
+                    (Media.id.in_(misses), self._has_annotations_column()),
+                    else_=None
+                )
+            ).join(Study).where(
+                Media.id.in_(media_ids),
+                Study.doctor_id == doctor_id,
+                Study.is_active,
+                Media.is_active
+            )
+        ).all()
+        
+        owned = {media_id for media_id, _ in rows}
+        computed = {media_id: bool(status) for media_id, status in rows if media_id not in statuses}
+        if cache:
+            cache.mset({
+                f"media_has_annotations:{media_id}": (b'1' if has_annotations else b'0', 86400)
+                for media_id, has_annotations in computed.items()
+            })
+        
+        statuses.update(computed)
+        return {media_id: status for media_id, status in statuses.items() if media_id in owned}
+
+    def _media_is_owned(self, media_id: UUID, doctor_id: UUID) -> bool:
+        """Check that an active media item belongs to one of the doctor's active studies"""
+        return self.db.query(
+            exists().where(
+                Media.id == media_id,
+                Media.study_id == Study.id,
+                Study.doctor_id == doctor_id,
+                Study.is_active,
+                Media.is_active
+            )
+        ).scalar()
+
+    @staticmethod
+    def _has_annotations_column():
+        """
+        SQL expression telling whether the selected media has classification annotations.
+        Images and frames are checked for a direct annotation, videos for an annotated
+        active frame; the media type picks the branch inside the query.
+        """
+        direct_annotation = exists().where(PictureClassificationAnnotation.media_id == Media.id)
+        frame_annotation = exists().where(
+            Frame.video_media_id == Media.id,
+            Frame.is_active,
+            PictureClassificationAnnotation.media_id == Frame.frame_media_id
+        )
+        return case(
+            (Media.media_type == MediaType.VIDEO, frame_annotation),
+            else_=direct_annotation
+        )
+
+    def _media_with_annotation_status(
+        self, media_id: UUID, doctor_id: UUID
+    ) -> Optional[tuple[MediaType, bool]]:
+        """
+        Get a media item's type and whether it has classification annotations.
+        Args:
+            media_id: ID of the media
+            doctor_id: ID of the doctor (for access control)
+        Returns:
+            Tuple of (media type, has annotations), or None if not found or not owned
+        """
+        row = self.db.execute(
+            select(Media.media_type, self._has_annotations_column()).join(Study).where(
+                Media.id == media_id,
+                Study.doctor_id == doctor_id,
+                Study.is_active,
+                Media.is_active
+            )
+        ).first()
+        return (row[0], bool(row[1])) if row else None
+
     @staticmethod
     def invalidate_annotation_cache(media_id: UUID, cache: Optional[RedisCache] = None) -> None:
         """
@@ -24,6 +24,7 @@ from app.services.media_service import MediaService
 from app.services.frame_service import FrameService
 from app.services.ai_prediction_service_v2 import AIPredictionService
 from app.core.file_storage import FileStorageService
+from app.core.cache import RedisCache
 from app.core.streaming_manager import streaming_session_manager
 from app.models.streaming import StreamingSession, FrameProcessingResult
 
@@ -43,10 +44,11 @@ def convert_image_to_base64_bytes(image: PILImage.Image) -> str:
 class RealTimeStreamingService:
     """Service for real-time video streaming and frame processing"""
     
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, cache: Optional[RedisCache] = None):
         self.db = db
+        self.cache = cache
         self.media_service = MediaService(db)
-        self.frame_service = FrameService(db) 
+        self.frame_service = FrameService(db, cache)
         self.file_storage = FileStorageService()
         self.ai_service = AIPredictionService(db)
         self.session_manager = streaming_session_manager
@@ -66,9 +68,7 @@ class RealTimeStreamingService:
         try:
             if not self.media_service.check_study_ownership(study_id, doctor_id):
                 raise ValueError("Study not found or access denied")
-            doctor_file_ids = self.media_service.get_doctor_file_ids(doctor_id)
-            storage_info = self.file_storage.get_storage_info(doctor_file_ids)
-            if storage_info['used_bytes'] >= self.file_storage.MAX_TOTAL_STORAGE:
+            if self.media_service.get_doctor_storage_bytes(doctor_id) >= self.file_storage.MAX_TOTAL_STORAGE:
                 raise ValueError("Storage limit exceeded. Cannot start new streaming session.")
             session_id = str(uuid.uuid4())
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -146,12 +146,14 @@ class RealTimeStreamingService:
                     'upload_status': UploadStatus.UPLOADED
                 })
                 self.db.commit()
+                MediaService.adjust_storage_cache(session.doctor_id, len(chunk_data), self.cache)
                 return False
             self.session_manager.update_session(session_id, session)
             self.db.query(Media).filter(Media.id == session.video_media_id).update(
                 {'file_size': session.total_size}
             )
             self.db.commit()
+            MediaService.adjust_storage_cache(session.doctor_id, len(chunk_data), self.cache)
             return True
         except Exception as e:
             logger.error(f"Failed to append video chunk to session {session_id}: {e}")
@@ -417,6 +419,7 @@ class RealTimeStreamingService:
             frame = Frame(**frame_record_data)
             self.db.add(frame)
             self.db.commit()
+            MediaService.adjust_storage_cache(session.doctor_id, frame_file_info.file_size, self.cache)
             self.db.refresh(frame)
             if confidence is not None:
                 try:
@@ -482,6 +485,8 @@ class RealTimeStreamingService:
                     'file_size': session.total_size
                 })
                 self.db.commit()
+            # Remuxing changed the stored size by an amount the chunk deltas didn't track
+            MediaService.invalidate_storage_cache(session.doctor_id, self.cache)
             unfinished_frame_idx = self._process_unfinished_runs(session_id)
             if unfinished_frame_idx is not None:
                 logger.info(f"Extracting frame from unfinished run at index {unfinished_frame_idx}")
@@ -14,6 +14,8 @@ from app.models.study import Study
 from app.models.media import Media
 from app.schemas.study import StudyCreate, StudyUpdate
 from app.services.user_service import UserService
+from app.services.media_service import MediaService
+from app.core.cache import RedisCache
 
 
 logger = logging.getLogger(__name__)
@@ -107,7 +109,8 @@ class StudyService:
             Total number of studies
         """
         # pylint: disable=not-callable
-        query = self.db.query(func.count(Study.id)).filter(Study.doctor_id == doctor_id)
+        # COUNT(*) keeps the active-only count answerable from ix_studies_doctor_active_created alone
+        query = self.db.query(func.count()).select_from(Study).filter(Study.doctor_id == doctor_id)
         if active_only:
             query = query.filter(Study.is_active)
         return query.scalar()
@@ -152,12 +155,13 @@ class StudyService:
         logger.info("Updated study %s for doctor %s", study_id, doctor_id)
         return db_study
 
-    def delete_study(self, study_id: UUID, doctor_id: UUID) -> bool:
+    def delete_study(self, study_id: UUID, doctor_id: UUID, cache: Optional[RedisCache] = None) -> bool:
         """
         Soft delete a study.
         Args:
             study_id: ID of the study
             doctor_id: ID of the doctor
+            cache: Optional RedisCache instance holding the doctor's storage total
         Returns:
             True if study was deleted, False if not found
         """
@@ -166,6 +170,9 @@ class StudyService:
             return False
         db_study.is_active = cast(Column[bool], False)
         self.db.commit()
+        self.db.info.pop("study_ownership_cache", None)
+        # The study's media no longer counts towards the doctor's storage
+        MediaService.invalidate_storage_cache(doctor_id, cache)
         logger.info("Soft deleted study %s for doctor %s", study_id, doctor_id)
         return True
 
@@ -14,6 +14,7 @@ from sqlalchemy.orm import Session
 from app.api.api import api_router
 from app.core.config import settings
 from app.core.database import get_db
+from app.core.ffmpeg_pool import shutdown_ffmpeg_pool
 from app.models.user import User as UserModel
 from app.models.user_role import UserRole as UserRoleModel, UserRoleType
 from app.services.admin_service import AdminService
@@ -57,6 +58,7 @@ async def lifespan(fastapi_app: FastAPI):
     yield
     # Shutdown
     logger.info("🛑 Shutting down IAMEDIC Backend application")
+    shutdown_ffmpeg_pool()
 
 
 async def cleanup_orphaned_media():
@@ -9,11 +9,11 @@ Classification service
 import os
 import base64
 
+import cv2
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import uvicorn
-from PIL import Image as PILImage
 import mlflow
 import mlflow.artifacts
 from mlflow.tracking import MlflowClient
@@ -26,7 +26,12 @@ MLFLOW_MODEL_NAME = os.getenv("MLFLOW_MODEL_NAME", "")
 MLFLOW_MODEL_ALIAS = os.getenv("MLFLOW_MODEL_ALIAS", "champion")
 TARGET_IMAGE_HEIGHT = int(os.getenv("TARGET_IMAGE_HEIGHT", -1))
 TARGET_IMAGE_WIDTH = int(os.getenv("TARGET_IMAGE_WIDTH", -1))
+TRT_FP16_ENABLE = os.getenv("TRT_FP16_ENABLE", "true").lower() == "true"
+USE_INT8_MODEL = os.getenv("USE_INT8_MODEL", "false").lower() == "true"
+INT8_CALIBRATION_DIR = os.getenv("INT8_CALIBRATION_DIR", "")
+INT8_CALIBRATION_SAMPLES = int(os.getenv("INT8_CALIBRATION_SAMPLES", 500))
 MODELS_DIR = "/app/models"
+TRT_ENGINE_CACHE_DIR = os.getenv("TRT_ENGINE_CACHE_DIR", f"{MODELS_DIR}/trt_cache")
 os.makedirs(MODELS_DIR, exist_ok=True)
 
 mlflow.set_tracking_uri(MLFLOW_URI)
@@ -58,6 +63,17 @@ class PredictionResponse(BaseModel):
     model_version: str
 
 
+class BatchPredictionRequest(BaseModel):
+    """Request schema for batch prediction"""
+    images: list[PredictionRequest]
+
+
+class BatchPredictionResponse(BaseModel):
+    """Batch prediction results, in request order"""
+    predictions: list[float]
+    model_version: str
+
+
 class ModelInfo(BaseModel):
     """Model information"""
     name: str
@@ -66,12 +82,109 @@ class ModelInfo(BaseModel):
     expected_height: int
 
 
+def resize_and_normalize_image(image: np.ndarray) -> np.ndarray:
+    """Resize an image to the model input size and normalize it to [-1, 1], staying in NumPy"""
+    bw = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    small = cv2.resize(bw, (TARGET_IMAGE_WIDTH, TARGET_IMAGE_HEIGHT), interpolation=cv2.INTER_AREA)
+    out = small.astype(np.float32)
+    out *= 1.0 / 127.5
+    out -= 1.0
+    return out
+
+
+def preprocess_batch(images: list[np.ndarray]) -> np.ndarray:
+    """Resize images to the model input size and normalize to [-1, 1] as one (N, 1, H, W) batch"""
+    resized = [
+        cv2.resize(
+            cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image,
+            (TARGET_IMAGE_WIDTH, TARGET_IMAGE_HEIGHT),
+            interpolation=cv2.INTER_AREA
+        ) for image in images
+    ]
+    batch = np.stack(resized).astype(np.float32)
+    np.multiply(batch, 1.0 / 127.5, out=batch)
+    np.subtract(batch, 1.0, out=batch)
+    return batch[:, np.newaxis]
+
+
+class FrameCalibrationReader:
+    """Feeds preprocessed calibration frames to ONNX Runtime static quantization"""
+
+    def __init__(self, image_paths: list[str]):
+        self._paths = iter(image_paths)
+
+    def get_next(self) -> dict | None:
+        for path in self._paths:
+            image = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+            if image is None:
+                continue
+            return {"input": resize_and_normalize_image(image)[np.newaxis, np.newaxis]}
+        return None
+
+
+def quantize_model_int8(model_path: str, model_version: str) -> str:
+    """
+    Quantize an FP32 ONNX model to INT8 once per model version and return the quantized model path.
+    Uses static QDQ per-channel quantization when calibration frames are available, dynamic otherwise.
+    """
+    from onnxruntime.quantization import QuantFormat, QuantType, quantize_dynamic, quantize_static
+
+    int8_path = f"{os.path.splitext(model_path)[0]}.v{model_version}.int8.onnx"
+    if os.path.exists(int8_path):
+        return int8_path
+    image_paths: list[str] = []
+    if INT8_CALIBRATION_DIR and os.path.isdir(INT8_CALIBRATION_DIR):
+        image_paths = sorted(
+            os.path.join(INT8_CALIBRATION_DIR, name) for name in os.listdir(INT8_CALIBRATION_DIR)
+            if name.lower().endswith((".png", ".jpg", ".jpeg", ".bmp"))
+        )[:INT8_CALIBRATION_SAMPLES]
+    if image_paths:
+        print(f"Calibrating INT8 model with {len(image_paths)} frames")
+        quantize_static(
+            model_path,
+            int8_path,
+            calibration_data_reader=FrameCalibrationReader(image_paths),  # type: ignore
+            quant_format=QuantFormat.QDQ,
+            per_channel=True
+        )
+    else:
+        print("No calibration frames found, using dynamic INT8 quantization")
+        quantize_dynamic(model_path, int8_path, weight_type=QuantType.QInt8)
+    return int8_path
+
+
+def get_execution_providers() -> list:
+    """TensorRT -> CUDA -> CPU, restricted to what the installed onnxruntime build supports"""
+    available = ort.get_available_providers()
+    providers: list = []
+    if "TensorrtExecutionProvider" in available:
+        os.makedirs(TRT_ENGINE_CACHE_DIR, exist_ok=True)
+        providers.append(("TensorrtExecutionProvider", {
+            "trt_engine_cache_enable": True,
+            "trt_engine_cache_path": TRT_ENGINE_CACHE_DIR,
+            "trt_fp16_enable": TRT_FP16_ENABLE,
+        }))
+    if "CUDAExecutionProvider" in available:
+        providers.append("CUDAExecutionProvider")
+    providers.append("CPUExecutionProvider")
+    return providers
+
+
+def create_inference_session(model_path: str) -> ort.InferenceSession:
+    """Create an ONNX Runtime session with full graph optimizations on the best available providers"""
+    sess_options = ort.SessionOptions()
+    sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    sess_options.enable_cpu_mem_arena = True
+    return ort.InferenceSession(model_path, sess_options=sess_options, providers=get_execution_providers())
+
+
 class ModelService:
     """Service to manage model loading and predictions"""
 
     def __init__(self):
         self.model = None
         self.model_version = None
+        self.dynamic_batch = False
         self.load_model()
     
     def load_model(self):
@@ -82,7 +195,16 @@ class ModelService:
             self.model_version = model_version_info.version
             model_file_name = model_version_info.source.split("/")[-1] # type: ignore
             mlflow.artifacts.download_artifacts(run_id=run_id, dst_path=MODELS_DIR)
-            self.model = ort.InferenceSession(f"{MODELS_DIR}/{model_file_name}")
+            model_path = f"{MODELS_DIR}/{model_file_name}"
+            if USE_INT8_MODEL:
+                try:
+                    model_path = quantize_model_int8(model_path, str(self.model_version))
+                    print(f"Using INT8 model {model_path}")
+                except Exception as e:
+                    print(f"INT8 quantization failed, using FP32 model: {e}")
+            self.model = create_inference_session(model_path)
+            print(f"Using execution providers: {self.model.get_providers()}")
+            self.dynamic_batch = not isinstance(self.model.get_inputs()[0].shape[0], int)
             print(f"Model loaded successfully. Version: {self.model_version}")
         except Exception as e:
             print(f"Error loading model: {e}")
@@ -128,6 +250,17 @@ class ModelService:
         result = self.model.run(None, {"input": data})
         return result
 
+    def predict_batch(self, batch: np.ndarray) -> np.ndarray:
+        """Predict a (N, 1, H, W) batch, one sample at a time if the model has a fixed batch size"""
+        if self.model is None:
+            raise RuntimeError("Model not loaded")
+        if self.dynamic_batch:
+            return np.asarray(self.model.run(None, {"input": batch})[0]).reshape(-1)
+        return np.concatenate([
+            np.asarray(self.model.run(None, {"input": batch[i:i + 1]})[0]).reshape(-1)
+            for i in range(len(batch))
+        ])
+
 
 # Initialize model service
 model_service = ModelService()
@@ -173,15 +306,9 @@ async def predict(request: PredictionRequest):
         # Decode base64 image data
         image_bytes = base64.b64decode(request.data)
         image = np.frombuffer(image_bytes, dtype=np.uint8).reshape((request.height, request.width))
-        # Convert to PIL and resize
-        pil_image = PILImage.fromarray(image)
-        pil_image = pil_image.resize((TARGET_IMAGE_WIDTH, TARGET_IMAGE_HEIGHT), PILImage.Resampling.LANCZOS)
-        image = np.array(pil_image)
-        print("Image resized")
-        # Normalize to [-1, 1]
-        image = (image.astype(np.float32) / 255.0 - 0.5) / 0.5
-        image = np.expand_dims(image, axis=0)  # Add batch dimension
-        image = np.expand_dims(image, axis=0)  # Add channel dimension
+        # Resize and normalize to [-1, 1]
+        image = resize_and_normalize_image(image)
+        image = image[np.newaxis, np.newaxis]  # Add batch and channel dimensions
         # Make prediction
         outputs = model_service.predict(image)
         print(outputs)
@@ -191,5 +318,23 @@ async def predict(request: PredictionRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/predict-batch", response_model=BatchPredictionResponse)
+async def predict_batch(request: BatchPredictionRequest):
+    try:
+        images = [
+            np.frombuffer(base64.b64decode(image.data), dtype=np.uint8).reshape((image.height, image.width))
+            for image in request.images
+        ]
+        if not images:
+            return BatchPredictionResponse(predictions=[], model_version=f"{MLFLOW_MODEL_NAME} - {model_service.model_version}")
+        predictions = model_service.predict_batch(preprocess_batch(images))
+        return BatchPredictionResponse(
+            predictions=predictions.astype(float).tolist(),
+            model_version=f"{MLFLOW_MODEL_NAME} - {model_service.model_version}"
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)